@@ -1,17 +1,20 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import pandas as pd
-import numpy as np
-
-import pickle
 import os
 import json
+import gzip
+import math
+import time
+import logging
+import threading
 
 import pygsheets
 
+import flask
+
 import folium
-from folium.plugins import LocateControl, MarkerCluster
+from folium.plugins import LocateControl
 
 import dash
 import dash_core_components as dcc
@@ -20,6 +23,19 @@ import dash_html_components as html
 from dash.dependencies import Input, Output
 
 from about import get_about_text
+from translations import translator
+from sheet_sync import SheetSync
+from snapshot import SheetSnapshot
+from render_cache import RenderCache
+from render_pool import RenderPool
+from markers import MARKER_COLORS, build_feature_collection
+from clustering import MAX_ZOOM
+from map_layers import ClusterTileLayer, GeoJsonMarkerCluster
+from spatial import MarkerIndex
+from matching import Matcher
+from responses import cached_response
+from metrics import metrics, instrument_server, profile_task
+import static_export
 
 #initialize app
 app = dash.Dash(
@@ -31,159 +47,132 @@ app = dash.Dash(
 )
 app.title = 'VolunteerAtlas'
 server = app.server
+instrument_server(server)
 
-if os.environ.get('GDRIVE_API_CREDENTIALS') is not None and '`' not in os.environ.get('GDRIVE_API_CREDENTIALS'):
-    gc = pygsheets.authorize(service_account_env_var='GDRIVE_API_CREDENTIALS') #web
-else:
-    gc = pygsheets.authorize(service_file='volunteeratlas-service.json') #local: hack due to windows env double quotes issue
+logger = logging.getLogger(__name__)
 
-def get_sheets_df(gc, sheet_id):
-    '''get and process google sheets into a dataframe
+gc = None
+gc_lock = threading.Lock()
+
+def get_client():
+    '''google sheets client, authorized on first use (thread-safe)
+    Workers serving from the shared snapshot never need to authorize at all.
     '''
+    global gc
+    if gc is None:
+        with gc_lock, metrics.span('sheets_auth'):
+            if gc is None:
+                if os.environ.get('GDRIVE_API_CREDENTIALS') is not None and '`' not in os.environ.get('GDRIVE_API_CREDENTIALS'):
+                    gc = pygsheets.authorize(service_account_env_var='GDRIVE_API_CREDENTIALS') #web
+                else:
+                    gc = pygsheets.authorize(service_file='volunteeratlas-service.json') #local: hack due to windows env double quotes issue
 
-    sh = gc.open_by_key(sheet_id) 
-    df1 = sh.worksheet_by_title("Volunteers").get_as_df()
-    df2 = sh.worksheet_by_title("Requests").get_as_df()
-
-    #process df
-    df1['Radius'] = df1['Radius'].str.replace('km','').astype(float)
-
-    def process_df(df, jitter=0.005):
-        '''process columns common to volunteer and request dataframes
-        '''
-        df['City/Town'] = df['City/Town'].str.title()
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
-        df['Latitude'] = df['Latitude'].replace('', np.nan, regex=False)\
-            .astype(float).apply(lambda x: x+np.random.uniform(-jitter,jitter)) 
-        df['Longtitude'] = df['Longtitude'].replace('', np.nan, regex=False)\
-            .astype(float).apply(lambda x: x+np.random.uniform(-jitter,jitter)) 
-
-        return df
-
-    return process_df(df1), process_df(df2)
-
-def translator(word, language):
-    translate_dict = {
-        'Volunteers':{'fr':'Bénévole'},
-        'Requests':{'fr':'Demandes'},
-        'Interactive Map':{'fr':'Carte interactive'},
-        'Volunteer Signup Form':{'fr':'Inscription des bénévoles'},
-        'Delivery Request Form':{'fr':'Demande de livraison'},
-        'About Us':{'fr':'À propos de nous'},
-        'Name':{'fr':'Nom'},
-        'Country':{'fr':'Pays'},
-        'City':{'fr':'Ville'},
-        'Services':{'fr':'Services'},
-        'Transportation':{'fr':'Transport'},
-        'Radius':{'fr':'Radius'},
-        'Day of Week':{'fr':'Jour de la semaine'},
-        'Time of Day':{'fr':'Moment de la journée'},
-        'Languages':{'fr':'Langues'},
-        'Payment':{'fr':'Paiement'},
-        'About Me':{'fr':'À propos de moi'},
-        'Type':{'fr':'Type'},
-        # '':{'fr':''},
-        }
-    if language != 'en':
-        return translate_dict[word][language]
-    else:
-        return word
-
-def build_folium_map(language):
-
-    # df_vol, df_req = get_sheets_df(gc, '16EcK3wX-bHfLpL3cj36j49PRYKl_pOp60IniREAbEB4') #TODO: hide sheetname
-    df_vol, df_req = get_sheets_df(gc, '1CmhMm_RnnIfP71bliknEYy8HWDph2kUlXoIhAbYeJQE') #Uncomment this sheet for testing (links to public sheet) and comment out line above
-
-    def get_popup_html(row, category):
-        '''Builds a folium HTML popup to display in folium marker objects
-        row (pandas Series): row from the google sheets dataframe
-        '''
-
-        va_email = 'volunteers.atlas@gmail.com'
-
-        if category == 'Volunteers':
-            email_subject = f"Delivery%20Request%20for%20{row['Given Name']}"
-            html = "<head><style>body{font-size:14px;font-family:sans-serif}</style></head><body>"+\
-                f"<b>{translator('Volunteers', language)}</b> <br>" + \
-                f"<b>{translator('Name', language)}:</b> {row['Given Name']} <br>" +  \
-                f"<b>{translator('Country', language)}:</b> {row['Country']} <br>" +\
-                f"<b>{translator('City', language)}:</b> {row['City/Town']} <br>" +\
-                f"<b>{translator('Services', language)}:</b> {row['Type of Services']} <br>" +\
-                f"<b>{translator('Transportation', language)}:</b> {row['Mode of Transportation']} <br>" +\
-                f"<b>{translator('Radius', language)}:</b> {int(row['Radius'])} km <br>" +\
-                f"<b>{translator('Day of Week', language)}:</b> {row['Preferred Day of Week']} <br>" +\
-                f"<b>{translator('Time of Day', language)}:</b> {row['Preferred Time of Day']} <br>" +\
-                f"<b>{translator('Languages', language)}:</b> {row['Languages Spoken']} <br>" +\
-                f"<b>{translator('Payment', language)}:</b> {row['Reimbursement Method']} <br>" +\
-                f"<b>{translator('About Me', language)}:</b> {row['About Me']} <br>" +\
-                f"<a href='mailto:{row['Email Address']}?cc={va_email}&Subject={email_subject}' target='_blank'>Contact {row['Given Name']}</a>  <br></body>"
-        elif category == 'Requests':
-            html = "<head><style>body{font-size:14px;font-family:sans-serif}</style></head><body>"+\
-                f"<b>{translator('Requests', language)}</b> <br>" + \
-                f"<b>{translator('Country', language)}:</b> {row['Country']} <br>" +\
-                f"<b>{translator('City', language)}:</b> {row['City/Town']} <br>" +\
-                f"<b>{translator('Services', language)}:</b> {row['Type of Services']} <br>" +\
-                f"<b>{translator('Type', language)}:</b> {row['Type of Request']} <br>" +\
-                f"<b>{translator('Day of Week', language)}:</b> {row['Preferred Day of Week']} <br>" +\
-                f"<b>{translator('Time of Day', language)}:</b> {row['Preferred Time of Day']} <br>" +\
-                f"<b>{translator('Languages', language)}:</b> {row['Languages Spoken']} <br>" +\
-                f"<b>{translator('Payment', language)}:</b> {row['Reimbursement Method']} <br>" +\
-                f"<a href='https://docs.google.com/forms/d/e/1FAIpQLSfw3LFsXtCCmr-ewkUuIltKIP5PKNY8Xn8h3MjVrFrvfvktPw/viewform?embedded=true' target='_blank'>Sign Up to Help</a>  <br></body>"
- 
-        iframe = folium.IFrame(html = folium.Html(html, script=True), width=260, height=len(html)/2.25)
-        popup = folium.Popup(iframe)
-    
-        return popup
+    return gc
 
-    def build_marker_cluster(m, df, category):
+startup = {'started_at': time.time(), 'ready_at': None}
 
-        dff = df.dropna(axis=0, how='any', subset=['Latitude','Longtitude']).copy()
+# SHEET_ID = '16EcK3wX-bHfLpL3cj36j49PRYKl_pOp60IniREAbEB4' #TODO: hide sheetname
+SHEET_ID = '1CmhMm_RnnIfP71bliknEYy8HWDph2kUlXoIhAbYeJQE' #Uncomment this sheet for testing (links to public sheet) and comment out line above
 
-        if category == 'Volunteers':
-            dff = dff.loc[(dff.Health == 'Yes') & (dff.Availability == 'Yes')]
-            marker_color = '#00d700'
-        elif category == 'Requests':
-            marker_color = '#d77a00'
+languages = ['en','fr']
+categories = ['Volunteers','Requests'] #same order as the (df_vol, df_req) snapshot data
 
-        #add marker cluster
-        mc = MarkerCluster(
-            name=translator(category, language),
-            control=True,
-            overlay=True,
-            showCoverageOnHover=False
-        )
+MAP_LOCATION = [42, -97.5] #Canada
+MAP_ZOOM = 4
 
-        #add circle markers
-        for idx, row in dff.iterrows():
-
-            dense_cities = ['Montreal','Toronto','Ottawa','Montréal','Cote St Luc','Gatineau'] #HACK: make people outside major clusters reflect their true radius
-            if category == 'Volunteers' and row['City/Town'] not in dense_cities:
-                radius = row['Radius']*1000
-            else:
-                radius = 250
-
-            mc.add_child(
-                folium.Circle(
-                    radius=radius,
-                    location=[row['Latitude'], row['Longtitude']],
-                    popup=get_popup_html(row, category),
-                    color=marker_color,
-                    fill=True,
-                    fill_color=marker_color
-                )
-            ).add_to(m)
+#only rows appended since the last fetch are downloaded, with a periodic full reconcile
+sheet_sync = SheetSync(SHEET_ID, reconcile_interval=float(os.environ.get('VA_RECONCILE_INTERVAL', 3600)))
+
+def fetch_sheets():
+    with metrics.span('fetch'):
+        return sheet_sync.fetch(get_client())
+
+#the snapshot is unpickled, so it must live where only the app's user can write: never a
+#predictable name in the shared temp directory
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'volunteeratlas-snapshot.pkl')
+
+#processed sheet data shared by all workers, refreshed in the background
+snapshot = SheetSnapshot(
+    fetch_sheets,
+    path=os.environ.get('VA_SNAPSHOT_PATH', SNAPSHOT_PATH),
+    interval=float(os.environ.get('VA_REFRESH_INTERVAL', 300)),
+)
+
+#rendered map html keyed by (data version, language)
+render_cache = RenderCache(max_bytes=int(os.environ.get('VA_RENDER_CACHE_MB', 64))*1024*1024)
+#slow map renders keyed by (data version, language), at most VA_RENDER_THREADS at a time;
+#callers wait up to VA_RENDER_TIMEOUT seconds, then get the last map rendered in their language
+render_pool = RenderPool(
+    max_workers=int(os.environ.get('VA_RENDER_THREADS', 2)),
+    timeout=float(os.environ.get('VA_RENDER_TIMEOUT', 10)),
+    fallback_key=lambda key: key[1]
+)
+
+#gzip-compressed marker geojson keyed by (data version, language, category), and cluster
+#tiles keyed by (data version, language, category, z, x, y)
+geojson_cache = RenderCache(max_bytes=int(os.environ.get('VA_RENDER_CACHE_MB', 64))*1024*1024)
+
+#prebuilt, content-hashed map pages and marker json (see static_export.py), exported on every
+#new snapshot when VA_STATIC_DIR is set and served from VA_STATIC_URL (this app, or a CDN)
+STATIC_DIR = os.environ.get('VA_STATIC_DIR')
+STATIC_URL = os.environ.get('VA_STATIC_URL', '/static-map')
+static_manifest = {'mtime': None, 'manifest': None}
+
+#{data version: {category: MarkerIndex}} for the viewport api
+marker_indexes = {}
+
+#{data version: ranked volunteer matches for every request} for the matches api
+matches_cache = {}
+MAX_MATCHES = 10
+
+def build_folium_map(language, version):
+    '''map shell for one language; the browser fetches the clusters in view from /api/tiles
+    version (str): data version, appended to the api urls so browsers never mix snapshots
+    '''
+
+    with metrics.span('map_build', language=language):
+        m = build_folium_figure(language, version)
+    with metrics.span('repr_html', language=language):
+        page = m._repr_html_()
+
+    metrics.inc('renders_total', kind='map_html')
+    metrics.observe('payload_bytes', len(page), kind='map_html')
+
+    return page
+
+def build_folium_figure(language, version, marker_urls=None):
+    '''the folium.Map behind build_folium_map
+    marker_urls (dict): category -> marker geojson url, for a self-contained page that clusters
+        in the browser instead of fetching tiles from /api/tiles (static export)
+    '''
 
     #build map
     m = folium.Map(
-        location=[42, -97.5], #Canada
+        location=MAP_LOCATION,
         tiles='Stamen Terrain',
         min_zoom=3,
-        zoom_start=4,
+        zoom_start=MAP_ZOOM,
         control_scale=True
     )
 
-    build_marker_cluster(m, df_vol, 'Volunteers')
-    build_marker_cluster(m, df_req, 'Requests')
+    for category in categories:
+        if marker_urls is None:
+            ClusterTileLayer(
+                url=f'/api/tiles/{category.lower()}/{{z}}/{{x}}/{{y}}?lang={language}&v={version}',
+                color=MARKER_COLORS[category],
+                max_zoom=MAX_ZOOM + 1,
+                name=translator(category, language),
+                control=True,
+                overlay=True
+            ).add_to(m)
+        else:
+            GeoJsonMarkerCluster(
+                url=marker_urls[category],
+                color=MARKER_COLORS[category],
+                name=translator(category, language),
+                control=True,
+                overlay=True
+            ).add_to(m)
 
     #add layer control
     folium.LayerControl(
@@ -199,7 +188,341 @@ def build_folium_map(language):
         locateOptions=dict(maxZoom=13)
     ).add_to(m)
     
-    return m._repr_html_()
+    return m
+
+def render_static_map(language, version, marker_urls):
+    '''standalone map page (full html document) loading its markers from marker_urls'''
+    with metrics.span('static_render', language=language):
+        page = build_folium_figure(language, version, marker_urls).get_root().render()
+    metrics.inc('renders_total', kind='static_map')
+    metrics.observe('payload_bytes', len(page), kind='static_map')
+
+    return page
+
+def export_static_map(out_dir, version, data):
+    '''write the static pages and marker json of a snapshot, see static_export.export_static'''
+    with metrics.span('static_export'):
+        return static_export.export_static(
+            out_dir, version, data,
+            lambda language, marker_urls: render_static_map(language, version, marker_urls),
+            languages, categories
+        )
+
+def get_static_manifest():
+    '''manifest of the latest static export in STATIC_DIR (re-read when the file changes), or None'''
+    if not STATIC_DIR:
+        return None
+    try:
+        mtime = os.path.getmtime(os.path.join(STATIC_DIR, static_export.MANIFEST))
+    except OSError:
+        return None
+    if mtime != static_manifest['mtime']:
+        static_manifest['manifest'] = static_export.read_manifest(STATIC_DIR)
+        static_manifest['mtime'] = mtime
+
+    return static_manifest['manifest']
+
+def get_static_map_url(language):
+    '''url of the exported map page for the current snapshot, or None when it isn't exported'''
+    manifest = get_static_manifest()
+    current = snapshot.current
+    if manifest is None or current is None or manifest['version'] != current[0] or language not in manifest['maps']:
+        return None
+
+    return f"{STATIC_URL}/{manifest['maps'][language]}"
+
+def render_map_html(version, language):
+    '''rendered map for a data version, built at most once per (data version, language)'''
+    return render_cache.get_or_build(
+        (version, language),
+        lambda: build_folium_map(language, version)
+    )
+
+def submit_map_render(version, language):
+    '''future for the rendered map, shared with any render of it already running on render_pool'''
+    return render_pool.submit((version, language), profile_task(lambda: render_map_html(version, language)))
+
+def get_map_html(language):
+    '''rendered map for the dash callback: a cache lookup when warm, otherwise the render runs
+    on render_pool, coalesced with the warm-up and falling back to the last good map on timeout
+    Only the very first request of a worker without any snapshot waits for the sheets.
+    '''
+    version, _ = snapshot.versioned()
+    html = render_cache.get((version, language))
+    if html is not None:
+        return html
+
+    return render_pool.run((version, language), profile_task(lambda: render_map_html(version, language)))
+
+def dump_payload(kind, payload):
+    '''compact json for an api payload, recording its size and marker/cluster counts'''
+    body = json.dumps(payload, separators=(',',':'))
+    metrics.inc('renders_total', kind=kind)
+    metrics.observe('payload_bytes', len(body), kind=kind)
+    metrics.observe('payload_markers', len(payload.get('markers', payload.get('features', []))), kind=kind)
+    if 'clusters' in payload:
+        metrics.observe('payload_clusters', len(payload['clusters']), kind=kind)
+
+    return body
+
+def get_geojson_gzip(version, data, language, category):
+    '''gzip-compressed GeoJSON for one category, built at most once per (data version, language)
+    '''
+    df = data[categories.index(category)]
+
+    return geojson_cache.get_or_build_gzip(
+        (version, language, category),
+        lambda: dump_payload('geojson', build_feature_collection(df, category, language))
+    )
+
+def get_marker_index(version, data, category):
+    '''spatial and cluster index over one category's markers, rebuilt once per data version
+    '''
+    indexes = marker_indexes.get(version)
+    if indexes is None:
+        with metrics.span('marker_index'):
+            indexes = {c: MarkerIndex(df, c) for c, df in zip(categories, data)}
+        marker_indexes.clear() #only the current snapshot is ever queried
+        marker_indexes[version] = indexes
+
+    return indexes[category]
+
+def build_matches(version, data):
+    '''top MAX_MATCHES volunteers for every request of a snapshot, kept in matches_cache'''
+    df_vol, df_req = data
+    with metrics.span('matching'):
+        matches = Matcher(df_vol).match(df_req, top_k=MAX_MATCHES)
+    matches_cache.clear() #only the current snapshot is ever queried
+    matches_cache[version] = matches
+
+    return matches
+
+def submit_matches(version, data):
+    '''future for the matches of a data version, shared with any build of them already running
+    on render_pool'''
+    return render_pool.submit((version, 'matches'), profile_task(lambda: build_matches(version, data)))
+
+def get_matches(version, data):
+    '''top MAX_MATCHES volunteers for every request, computed once per data version
+    Concurrent requests wait on the same build; there is no fallback, since the matches of
+    another version refer to other rows.
+    '''
+    matches = matches_cache.get(version)
+    if matches is None:
+        matches = submit_matches(version, data).result()
+
+    return matches
+
+def warm_map_cache(version, data):
+    '''pre-render every language, match volunteers to requests and rebuild the marker and
+    cluster indexes as soon as a new snapshot is loaded'''
+    get_marker_index(version, data, categories[0])
+    renders = [submit_map_render(version, language) for language in languages if (version, language) not in render_cache]
+    if version not in matches_cache:
+        renders.append(submit_matches(version, data))
+    for future in renders:
+        future.result()
+
+    if STATIC_DIR:
+        manifest = get_static_manifest()
+        if manifest is None or manifest['version'] != version: #exported once, by whichever worker gets here first
+            static_export.prune(STATIC_DIR, export_static_map(STATIC_DIR, version, data))
+
+@server.route('/api/geojson/<language>/<category>')
+def serve_geojson(language, category):
+    '''markers of one category as a GeoJSON FeatureCollection
+    Responses carry an ETag per data version; requests pinned to the current version (?v=)
+    may be cached by the browser for a day.
+    '''
+    category = category.title()
+    if language not in languages or category not in categories:
+        flask.abort(404)
+
+    version, data = snapshot.versioned()
+    return cached_response(
+        get_geojson_gzip(version, data, language, category),
+        etag=f'{version}-{language}-{category}',
+        last_modified=snapshot.fetched_at,
+        mimetype='application/geo+json',
+        max_age=86400 if flask.request.args.get('v') == version else 60
+    )
+
+def on_new_snapshot(version, data):
+    '''re-render in the background whenever the refresh loop loads a new snapshot'''
+    if snapshot.running:
+        threading.Thread(target=warm_map_cache, args=(version, data), daemon=True).start()
+
+snapshot.subscribe(on_new_snapshot)
+
+def is_ready():
+    '''True once the current snapshot is loaded and the map is rendered for every language'''
+    current = snapshot.current
+    return current is not None and all((current[0], language) in render_cache for language in languages)
+
+def warm_up(timeout=None):
+    '''load the snapshot (fetching the sheets if no worker has yet) and render every language,
+    waiting at most timeout seconds; returns is_ready()
+    '''
+    def run():
+        try:
+            warm_map_cache(*snapshot.versioned())
+        except Exception:
+            logger.exception('warm-up failed, caches will fill on demand')
+
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    if is_ready():
+        startup['ready_at'] = time.time()
+        logger.info('caches warm after %.2fs', startup['ready_at'] - startup['started_at'])
+    else:
+        logger.warning('caches not warm after %ss, serving anyway', timeout)
+
+    return is_ready()
+
+def init_worker():
+    '''per-process startup: warm the caches, bounded by VA_WARMUP_TIMEOUT, then start the
+    background refresh loop. Called from the gunicorn post_fork hook (gunicorn.conf.py) before
+    the worker accepts connections.
+    '''
+    startup['started_at'] = time.time()
+    warm_up(timeout=float(os.environ.get('VA_WARMUP_TIMEOUT', 20)))
+    snapshot.start()
+
+#workers started without the gunicorn hook still get the refresh loop
+server.before_first_request(snapshot.start)
+
+def collect_metrics(metrics):
+    '''live values for /metrics: cache and render pool counters, snapshot state'''
+    for name, cache in (('map_html', render_cache), ('api', geojson_cache)):
+        metrics.set('cache_hits_total', cache.hits, cache=name)
+        metrics.set('cache_misses_total', cache.misses, cache=name)
+        metrics.set('cache_bytes', cache.nbytes, cache=name)
+        metrics.set('cache_entries', len(cache), cache=name)
+    for event in ('builds', 'coalesced', 'fallbacks'):
+        metrics.set('render_pool_total', getattr(render_pool, event), event=event)
+
+    current = snapshot.current
+    metrics.set('ready', int(is_ready()))
+    metrics.set('process_start_time_seconds', startup['started_at'], pid=os.getpid())
+    if current is not None:
+        metrics.set('snapshot_age_seconds', round(snapshot.age, 3))
+        for category, df in zip(categories, current[1]):
+            metrics.set('snapshot_rows', len(df), category=category)
+
+metrics.declare('render_pool_total', 'counter', 'Map renders submitted to the render pool, coalesced or served stale.')
+metrics.declare('ready', 'gauge', '1 once the snapshot is loaded and every language is rendered.')
+metrics.declare('snapshot_age_seconds', 'gauge', 'Seconds since the current snapshot was fetched.')
+metrics.declare('snapshot_rows', 'gauge', 'Rows in the current snapshot.')
+metrics.add_collector(collect_metrics)
+
+@server.route('/metrics')
+def serve_metrics():
+    '''Prometheus metrics for this worker'''
+    return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@server.route('/healthz/ready')
+def serve_readiness():
+    '''200 once this worker's caches are warm, 503 before'''
+    ready = is_ready()
+    current = snapshot.current
+    body = {
+        'ready': ready,
+        'pid': os.getpid(),
+        'version': current[0] if current is not None else None,
+        'snapshot_age': round(snapshot.age, 1) if current is not None else None,
+        'cold_start_seconds': round(startup['ready_at'] - startup['started_at'], 3) if startup['ready_at'] else None,
+    }
+
+    return flask.jsonify(body), 200 if ready else 503
+
+@server.route('/api/markers')
+def serve_markers():
+    '''markers and clusters of one category inside a bounding box
+    query: category, bbox=west,south,east,north (leaflet toBBoxString), zoom, lang
+    '''
+    args = flask.request.args
+    category = args.get('category', '').title()
+    language = args.get('lang', 'en')
+    try:
+        bbox = tuple(float(x) for x in args['bbox'].split(','))
+        zoom = int(args.get('zoom', 0))
+    except (KeyError, ValueError):
+        flask.abort(400)
+    if category not in categories or language not in languages or len(bbox) != 4 \
+            or not all(math.isfinite(v) for v in bbox) or bbox[1] > bbox[3]: #nan/inf would reach the grid as INT_MIN
+        flask.abort(400)
+
+    version, data = snapshot.versioned()
+    with metrics.span('markers_query'):
+        result = get_marker_index(version, data, category).query(bbox, zoom, language)
+    body = dump_payload('markers', result).encode('utf-8')
+
+    return cached_response(
+        gzip.compress(body, compresslevel=5),
+        etag=f'{version}-{language}-{category}-{zoom}-{args["bbox"]}',
+        last_modified=snapshot.fetched_at,
+        max_age=3600 if args.get('v') == version else 60
+    )
+
+@server.route('/api/tiles/<category>/<int:z>/<int:x>/<int:y>')
+def serve_tile(category, z, x, y):
+    '''precomputed markers and clusters of one category in slippy map tile z/x/y
+    query: lang, v (data version; pinned tiles may be cached by the browser for a day)
+    same format as /api/markers
+    '''
+    category = category.title()
+    language = flask.request.args.get('lang', 'en')
+    if category not in categories or language not in languages or not 0 <= z <= MAX_ZOOM + 1 \
+            or not (0 <= x < 2**z and 0 <= y < 2**z):
+        flask.abort(404)
+
+    version, data = snapshot.versioned()
+    index = get_marker_index(version, data, category)
+
+    return cached_response(
+        geojson_cache.get_or_build_gzip(
+            (version, language, category, z, x, y),
+            lambda: dump_payload('tile', index.tile(z, x, y, language))
+        ),
+        etag=f'{version}-{language}-{category}-{z}-{x}-{y}',
+        last_modified=snapshot.fetched_at,
+        max_age=86400 if flask.request.args.get('v') == version else 60
+    )
+
+@server.route('/static-map/<path:filename>')
+def serve_static_map(filename):
+    '''exported map pages and marker json, precompressed and cached for a year (content-hashed)'''
+    if not STATIC_DIR:
+        flask.abort(404)
+
+    return static_export.send_asset(STATIC_DIR, filename)
+
+@server.route('/api/matches')
+def serve_matches():
+    '''ranked volunteers whose radius covers a request and who share a language with it
+    query: request (request id, as in /api/markers), top (default 5, max MAX_MATCHES)
+    '''
+    args = flask.request.args
+    try:
+        request_id = int(args['request'])
+        top = min(int(args.get('top', 5)), MAX_MATCHES)
+    except (KeyError, ValueError):
+        flask.abort(400)
+
+    version, data = snapshot.versioned()
+    matches = get_matches(version, data)
+    matches = matches.loc[(matches['request_id'] == request_id) & (matches['rank'] <= top)]
+    names = data[0].loc[matches['volunteer_id'], 'Given Name'].astype(str).tolist()
+
+    return flask.jsonify({
+        'request': request_id,
+        'volunteers': [
+            {'id': int(v), 'name': name, 'rank': int(rank), 'distance_km': round(float(d), 2), 'score': round(float(score), 3)}
+            for v, name, rank, d, score in zip(matches['volunteer_id'], names, matches['rank'], matches['distance_km'], matches['score'])
+        ]
+    })
 
 app.layout = html.Div(
     children=[
@@ -224,7 +547,11 @@ app.layout = html.Div(
         ), 
         dcc.Tabs(id='tabs', value='tab-map', style={'height':'20%','width':'100%'} 
         ),
-        html.Div(id='tabs-content', style={'height':'50%','width':'100%'} ),
+        dcc.Loading(
+            id='tabs-loading',
+            type='default',
+            children=html.Div(id='tabs-content', style={'height':'50%','width':'100%'} )
+        ),
         html.Div(id='footer', children=[], style={'height':'10%','width':'100%'})
 ])
 
@@ -252,7 +579,6 @@ def update_label(url):
 
 # this callback uses the current pathname to set the active state of the
 # corresponding nav link to true, allowing users to tell see page they are on
-languages = ['en','fr']
 @app.callback(
     [Output(f'{i}-link', 'active') for i in languages],
     [Input('url', 'pathname')],
@@ -282,9 +608,18 @@ def render_content(tab, url, iframe_height=800):
     language = get_url_language(url)
 
     if tab == 'tab-map':
+        static_url = get_static_map_url(language)
+        if static_url is not None: #browser-cached after the first visit, no map html in the callback
+            return html.Iframe(
+                id='folium-map',
+                src=static_url,
+                height=iframe_height,
+                width='100%',
+                style={'overflow':'hidden','overflow-x':'hidden','overflow-y':'hidden'}
+                )
         return html.Iframe(
             id='folium-map', 
-            srcDoc=build_folium_map(language),
+            srcDoc=get_map_html(language),
             height=iframe_height,
             width='100%',
             style={'overflow':'hidden','overflow-x':'hidden','overflow-y':'hidden'} #ISSUE: Fix IFrame y-scroll bar
@@ -311,4 +646,5 @@ def render_content(tab, url, iframe_height=800):
         )
         
 if __name__ == '__main__':
+    init_worker()
     app.run_server(debug=False, port=5000)
\ No newline at end of file
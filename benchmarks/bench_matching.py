@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''Benchmark of the volunteer-request matching engine on synthetic sheets
+
+    python -m benchmarks.bench_matching --volunteers 10000 --requests 10000
+'''
+
+import argparse
+import time
+
+from sheets import process_volunteers, process_requests
+from matching import Matcher
+from benchmarks.synthetic import make_volunteers, make_requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--volunteers', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--chunk', type=int, default=512, help='requests per distance matrix block')
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    df_vol = process_volunteers(make_volunteers(args.volunteers))
+    df_req = process_requests(make_requests(args.requests))
+
+    start = time.perf_counter()
+    matcher = Matcher(df_vol, chunk=args.chunk)
+    t_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches = matcher.match(df_req, top_k=args.top_k)
+    t_match = time.perf_counter() - start
+
+    print(f'{len(matcher)} available volunteers x {len(df_req)} requests')
+    print(f'build: {t_build:.3f}s  match: {t_match:.3f}s  '
+          f'({len(matcher) * len(df_req) / t_match / 1e6:.1f}M pairs/s)')
+    print(f"{len(matches)} matches, {matches['request_id'].nunique()} requests with at least one volunteer")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''End-to-end benchmark of the map pipeline on synthetic sheets, saved as JSON
+
+Synthetic worksheets are served by a fake_sheets.FakeClient and go through the same
+code as production: get_sheets_df, the snapshot, the marker/cluster indexes, the map
+shell (build_folium_map) and the api payloads a first page view fetches, per language.
+Every stage reports wall time (best of --repeat runs), peak traced memory (one extra
+run under tracemalloc) and output size.
+
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 --output before.json
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 --compare before.json
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import tracemalloc
+
+os.environ.setdefault('VA_SNAPSHOT_PATH', os.path.join(tempfile.mkdtemp(), 'snapshot.pkl')) #never the live snapshot
+
+import numpy as np
+import pandas as pd
+import folium
+
+import app
+from sheets import get_sheets_df, process_volunteers, process_requests
+from snapshot import SheetSnapshot
+from clustering import project
+from markers import build_feature_collection
+from matching import Matcher
+from benchmarks.synthetic import make_client, REGIONS
+
+SHEET_ID = 'benchmark'
+
+def measure(fn, repeat):
+    '''(best seconds, median seconds, peak traced MB, result of the last run)'''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    return min(times), statistics.median(times), peak, result
+
+def viewport_tiles(lat, lon, zoom, width=1280, height=800):
+    '''(z, x, y) of the 256px tiles a width x height map centered on lat/lon requests'''
+    x, y = project([lat], [lon])
+    size = 256 * 2**zoom
+    cx, cy = x[0] * size, y[0] * size
+    xs = range(int((cx - width / 2) // 256), int((cx + width / 2) // 256) + 1)
+    ys = range(max(int((cy - height / 2) // 256), 0), min(int((cy + height / 2) // 256), 2**zoom - 1) + 1)
+
+    return [(zoom, tx % 2**zoom, ty) for tx in xs for ty in ys]
+
+def run_size(n_vol, n_req, args):
+    '''all stage records for one dataset size'''
+    client = make_client(SHEET_ID, n_vol, n_req, seed=args.seed, region=args.region)
+    sheet = client.open_by_key(SHEET_ID)
+    records = []
+
+    def stage(name, fn, **labels):
+        best, median, peak, result = measure(fn, args.repeat)
+        record = {'volunteers': n_vol, 'requests': n_req, 'stage': name, 'seconds': round(best, 6),
+            'seconds_median': round(median, 6), 'peak_mb': round(peak, 3)}
+        record.update(labels)
+        records.append(record)
+        return record, result
+
+    #fetch + process, as in get_sheets_df
+    _, raw_vol = stage('get_as_df', lambda: sheet.worksheet_by_title('Volunteers').get_as_df(), category='Volunteers')
+    _, raw_req = stage('get_as_df', lambda: sheet.worksheet_by_title('Requests').get_as_df(), category='Requests')
+    stage('process_df', lambda: process_volunteers(raw_vol.copy()), category='Volunteers')
+    stage('process_df', lambda: process_requests(raw_req.copy()), category='Requests')
+    stage('get_sheets_df', lambda: get_sheets_df(client, SHEET_ID))
+
+    #the shared snapshot: fetch, version hash and pickle
+    path = os.path.join(tempfile.mkdtemp(), 'snapshot.pkl')
+    snapshot = SheetSnapshot(lambda: get_sheets_df(client, SHEET_ID), path=path, interval=0) #refresh() always refetches
+
+    def refresh():
+        snapshot.refresh()
+        return snapshot.current #unlike versioned(), never starts a background refresh
+
+    record, (version, data) = stage('snapshot_refresh', refresh)
+    record['bytes'] = os.path.getsize(path)
+
+    indexes = {}
+    for category, df in zip(app.categories, data):
+        record, indexes[category] = stage('marker_index', lambda: app.MarkerIndex(df, category), category=category)
+        record['markers'] = len(indexes[category])
+        record['cluster_index_bytes'] = indexes[category].clusters.nbytes
+
+    record, matches = stage('matching', lambda: Matcher(data[0]).match(data[1], top_k=app.MAX_MATCHES))
+    record['matches'] = len(matches)
+
+    #what a first page view costs, per language: the map shell and the api payloads it loads
+    tiles = viewport_tiles(*app.MAP_LOCATION, app.MAP_ZOOM)
+    for language in app.languages:
+        record, page = stage('build_folium_map', lambda: app.build_folium_map(language, version), language=language)
+        record['bytes'] = len(page.encode('utf-8'))
+
+        for category, df in zip(app.categories, data):
+            record, body = stage(
+                'geojson', lambda: json.dumps(build_feature_collection(df, category, language), separators=(',',':')),
+                language=language, category=category
+            )
+            record['bytes'] = len(body.encode('utf-8'))
+
+            record, bodies = stage(
+                'initial_tiles',
+                lambda: [json.dumps(indexes[category].tile(z, x, y, language), separators=(',',':')) for z, x, y in tiles],
+                language=language, category=category
+            )
+            record['bytes'] = sum(len(b.encode('utf-8')) for b in bodies)
+            record['tiles'] = len(tiles)
+
+    return records
+
+def environment():
+    '''commit and library versions the results were measured with'''
+    def git(*cmd):
+        try:
+            return subprocess.run(['git'] + list(cmd), capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'folium': folium.__version__,
+    }
+
+def record_key(record):
+    return tuple(record.get(k) for k in ('volunteers', 'requests', 'stage', 'language', 'category'))
+
+def compare(results, baseline, threshold, min_seconds):
+    '''print the change of every stage against a baseline run; returns the regressions
+    Stages faster than min_seconds in both runs are too noisy to flag on time alone.
+    '''
+    before = {record_key(r): r for r in baseline['results']}
+    regressions = []
+
+    print(f"\ncompared to {(baseline['environment'].get('commit') or '?')[:10]}")
+    print(f"{'rows':>9} {'stage':<18} {'lang':<4} {'category':<10} {'seconds':>10} {'change':>8} {'peak MB':>9} {'change':>8}")
+    for record in results:
+        old = before.get(record_key(record))
+        if old is None:
+            continue
+        time_ratio = record['seconds'] / max(old['seconds'], 1e-9)
+        mem_ratio = record['peak_mb'] / max(old['peak_mb'], 1e-9)
+        slower = time_ratio > threshold and max(record['seconds'], old['seconds']) >= min_seconds
+        flag = ' !' if slower or mem_ratio > threshold else ''
+        if flag:
+            regressions.append(record)
+        print(f"{record['volunteers']:>9} {record['stage']:<18} {record.get('language') or '':<4} {record.get('category') or '':<10}"
+            f" {record['seconds']:9.4f}s {time_ratio:7.2f}x {record['peak_mb']:9.1f} {mem_ratio:7.2f}x{flag}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='volunteer rows')
+    parser.add_argument('--requests-ratio', type=float, default=0.5, help='request rows per volunteer row')
+    parser.add_argument('--region', choices=sorted(REGIONS), default='canada')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (the best one is kept)')
+    parser.add_argument('--output', help='write the results to this json file')
+    parser.add_argument('--compare', help='json file of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown or memory growth reported as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.01, help='ignore slowdowns of stages faster than this')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rows':>9} {'stage':<18} {'lang':<4} {'category':<10} {'seconds':>10} {'peak MB':>9} {'bytes':>11}")
+    for n in args.sizes:
+        for record in run_size(n, int(n * args.requests_ratio), args):
+            results.append(record)
+            print(f"{n:>9} {record['stage']:<18} {record.get('language') or '':<4} {record.get('category') or '':<10}"
+                f" {record['seconds']:9.4f}s {record['peak_mb']:9.1f} {record.get('bytes', ''):>11}")
+
+    report = {
+        'environment': environment(),
+        'parameters': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f'\nsaved to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_seconds)
+        if regressions:
+            print(f'\n{len(regressions)} stage(s) regressed by more than {args.threshold}x')
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''Benchmark of popup html generation: legacy per-row f-strings + folium.IFrame/Popup
+objects vs the precompiled per-language template rendered in bulk
+
+    python -m benchmarks.bench_popups --sizes 1000 10000 100000
+'''
+
+import argparse
+import time
+import tracemalloc
+
+from sheets import process_volunteers
+from markers import get_marker_df, render_popups
+from benchmarks.synthetic import make_volunteers
+from benchmarks.legacy import legacy_popup
+
+def measure(fn):
+    '''(seconds, peak traced memory in MB, result)'''
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+
+    return elapsed, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--language', default='fr')
+    parser.add_argument('--legacy-max', type=int, default=100000, help='skip the slow per-row code above this size')
+    args = parser.parse_args()
+
+    print(f"{'markers':>8} {'legacy':>9} {'legacy MB':>10} {'template':>9} {'template MB':>12} {'speedup':>8}")
+    for n in args.sizes:
+        dff = get_marker_df(process_volunteers(make_volunteers(n)), 'Volunteers')
+        render_popups(dff.iloc[:1], 'Volunteers', args.language) #compile the template outside the timing
+
+        t_new, mb_new, _ = measure(lambda: render_popups(dff, 'Volunteers', args.language))
+        if n <= args.legacy_max:
+            t_old, mb_old, _ = measure(lambda: [legacy_popup(row, 'Volunteers', args.language) for _, row in dff.iterrows()])
+            print(f'{len(dff):>8} {t_old:8.3f}s {mb_old:10.1f} {t_new:8.3f}s {mb_new:12.1f} {t_old / t_new:7.0f}x')
+        else:
+            print(f"{len(dff):>8} {'-':>9} {'-':>10} {t_new:8.3f}s {mb_new:12.1f} {'-':>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''Micro-benchmark of the sheet preprocessing, per-row (legacy) vs vectorized
+
+    python -m benchmarks.bench_process --sizes 1000 10000 100000 1000000
+'''
+
+import argparse
+import time
+
+from sheets import process_df
+from markers import build_feature_collection
+from benchmarks.synthetic import make_volunteers
+from benchmarks.legacy import legacy_process_df, legacy_feature_collection
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def prepare(raw):
+    raw['Radius'] = raw['Radius'].str.replace('km','').astype(float)
+    return raw
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--legacy-max', type=int, default=100000, help='skip the slow per-row code above this size')
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'legacy process':>15} {'process_df':>11} {'legacy features':>16} {'features':>9}")
+    for n in args.sizes:
+        raw = prepare(make_volunteers(n))
+
+        processed = process_df(raw.copy())
+        t_process = timed(process_df, raw.copy())
+        t_features = timed(build_feature_collection, processed, 'Volunteers', 'en')
+
+        if n <= args.legacy_max:
+            legacy = legacy_process_df(raw.copy())
+            t_legacy = f'{timed(legacy_process_df, raw.copy()):14.3f}s'
+            t_legacy_markers = f'{timed(legacy_feature_collection, legacy):15.3f}s'
+        else:
+            t_legacy, t_legacy_markers = f"{'-':>15}", f"{'-':>16}"
+
+        print(f'{n:>9} {t_legacy} {t_process:10.3f}s {t_legacy_markers} {t_features:8.3f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''The original (pre-optimization) implementations, kept as baselines for the benchmarks
+'''
+
+import numpy as np
+import pandas as pd
+
+import folium
+
+from markers import DENSE_CITIES
+
+def legacy_translator(word, language):
+    '''translator as it was: rebuilds the dictionary on every call'''
+    translate_dict = {
+        'Volunteers':{'fr':'Bénévole'},
+        'Requests':{'fr':'Demandes'},
+        'Name':{'fr':'Nom'},
+        'Country':{'fr':'Pays'},
+        'City':{'fr':'Ville'},
+        'Services':{'fr':'Services'},
+        'Transportation':{'fr':'Transport'},
+        'Radius':{'fr':'Radius'},
+        'Day of Week':{'fr':'Jour de la semaine'},
+        'Time of Day':{'fr':'Moment de la journée'},
+        'Languages':{'fr':'Langues'},
+        'Payment':{'fr':'Paiement'},
+        'About Me':{'fr':'À propos de moi'},
+        'Type':{'fr':'Type'},
+        }
+    if language != 'en':
+        return translate_dict[word][language]
+    else:
+        return word
+
+def legacy_popup(row, category, language):
+    '''per-row f-string concatenation wrapped in folium.IFrame + folium.Popup objects'''
+    translator = legacy_translator
+    va_email = 'volunteers.atlas@gmail.com'
+
+    if category == 'Volunteers':
+        email_subject = f"Delivery%20Request%20for%20{row['Given Name']}"
+        html = "<head><style>body{font-size:14px;font-family:sans-serif}</style></head><body>"+\
+            f"<b>{translator('Volunteers', language)}</b> <br>" + \
+            f"<b>{translator('Name', language)}:</b> {row['Given Name']} <br>" +  \
+            f"<b>{translator('Country', language)}:</b> {row['Country']} <br>" +\
+            f"<b>{translator('City', language)}:</b> {row['City/Town']} <br>" +\
+            f"<b>{translator('Services', language)}:</b> {row['Type of Services']} <br>" +\
+            f"<b>{translator('Transportation', language)}:</b> {row['Mode of Transportation']} <br>" +\
+            f"<b>{translator('Radius', language)}:</b> {int(row['Radius'])} km <br>" +\
+            f"<b>{translator('Day of Week', language)}:</b> {row['Preferred Day of Week']} <br>" +\
+            f"<b>{translator('Time of Day', language)}:</b> {row['Preferred Time of Day']} <br>" +\
+            f"<b>{translator('Languages', language)}:</b> {row['Languages Spoken']} <br>" +\
+            f"<b>{translator('Payment', language)}:</b> {row['Reimbursement Method']} <br>" +\
+            f"<b>{translator('About Me', language)}:</b> {row['About Me']} <br>" +\
+            f"<a href='mailto:{row['Email Address']}?cc={va_email}&Subject={email_subject}' target='_blank'>Contact {row['Given Name']}</a>  <br></body>"
+    elif category == 'Requests':
+        html = "<head><style>body{font-size:14px;font-family:sans-serif}</style></head><body>"+\
+            f"<b>{translator('Requests', language)}</b> <br>" + \
+            f"<b>{translator('Country', language)}:</b> {row['Country']} <br>" +\
+            f"<b>{translator('City', language)}:</b> {row['City/Town']} <br>" +\
+            f"<b>{translator('Services', language)}:</b> {row['Type of Services']} <br>" +\
+            f"<b>{translator('Type', language)}:</b> {row['Type of Request']} <br>" +\
+            f"<b>{translator('Day of Week', language)}:</b> {row['Preferred Day of Week']} <br>" +\
+            f"<b>{translator('Time of Day', language)}:</b> {row['Preferred Time of Day']} <br>" +\
+            f"<b>{translator('Languages', language)}:</b> {row['Languages Spoken']} <br>" +\
+            f"<b>{translator('Payment', language)}:</b> {row['Reimbursement Method']} <br>" +\
+            f"<a href='https://docs.google.com/forms/d/e/1FAIpQLSfw3LFsXtCCmr-ewkUuIltKIP5PKNY8Xn8h3MjVrFrvfvktPw/viewform?embedded=true' target='_blank'>Sign Up to Help</a>  <br></body>"
+
+    iframe = folium.IFrame(html = folium.Html(html, script=True), width=260, height=len(html)/2.25)
+    popup = folium.Popup(iframe)
+
+    return popup
+
+def legacy_process_df(df, jitter=0.005):
+    '''process_df as it was before vectorization: one python call per coordinate'''
+    df['City/Town'] = df['City/Town'].str.title()
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    df['Latitude'] = df['Latitude'].replace('', np.nan, regex=False)\
+        .astype(float).apply(lambda x: x+np.random.uniform(-jitter,jitter))
+    df['Longtitude'] = df['Longtitude'].replace('', np.nan, regex=False)\
+        .astype(float).apply(lambda x: x+np.random.uniform(-jitter,jitter))
+
+    return df
+
+def legacy_feature_collection(df, category='Volunteers', language='en', popup=None):
+    '''marker filtering and iterrows() walk as done by the old build_marker_cluster
+    popup (callable): popup builder for one row, by default the html of legacy_popup
+    '''
+    popup = popup or (lambda row, category, language: legacy_popup(row, category, language).html.render())
+    dff = df.dropna(axis=0, how='any', subset=['Latitude','Longtitude']).copy()
+    dff = dff.loc[(dff.Health == 'Yes') & (dff.Availability == 'Yes')]
+
+    features = []
+    for idx, row in dff.iterrows():
+        radius = 250 if row['City/Town'] in DENSE_CITIES else row['Radius']*1000
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(row['Longtitude'], 5), round(row['Latitude'], 5)]},
+            'properties': {'r': radius, 'popup': popup(row, category, language)}
+        })
+
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''Concurrent load test of the map tab against a running server
+
+Each client repeatedly fires the dash callback that renders the map tab (the request a
+browser makes on every tab click or language switch) and the latency distribution is
+reported at the end.
+
+    gunicorn --config gunicorn.conf.py app:server &
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --clients 50 --requests 20
+'''
+
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+def map_tab_payload(language):
+    '''body of the render_content callback request for the map tab'''
+    return json.dumps({
+        'output': 'tabs-content.children',
+        'outputs': {'id': 'tabs-content', 'property': 'children'},
+        'inputs': [
+            {'id': 'tabs', 'property': 'value', 'value': 'tab-map'},
+            {'id': 'url', 'property': 'pathname', 'value': f'/{language}'},
+        ],
+        'changedPropIds': ['tabs.value'],
+    }).encode()
+
+def client(url, languages, n):
+    '''fire n map tab callbacks, alternating languages; returns latencies in seconds and errors'''
+    latencies, errors = [], 0
+    for i in range(n):
+        request = urllib.request.Request(
+            url + '/_dash-update-component',
+            data=map_tab_payload(languages[i % len(languages)]),
+            headers={'Content-Type': 'application/json'}
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    parser.add_argument('--languages', nargs='+', default=['en', 'fr'])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(lambda _: client(args.url, args.languages, args.requests), range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([t for latencies, _ in results for t in latencies]) * 1000
+    errors = sum(errors for _, errors in results)
+    if not len(latencies):
+        raise SystemExit(f'all {errors} requests failed')
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    print(f'{args.clients} clients x {args.requests} requests in {elapsed:.1f}s '
+          f'({len(latencies) / elapsed:.0f} req/s, {errors} errors)')
+    print(f'latency ms  p50 {p50:.0f}  p90 {p90:.0f}  p99 {p99:.0f}  max {latencies.max():.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''Synthetic "Volunteers" / "Requests" worksheets with the same columns and raw
+(unprocessed, as returned by get_as_df) values as the real google sheets
+'''
+
+import numpy as np
+import pandas as pd
+
+from fake_sheets import FakeClient
+
+COUNTRIES = ['Canada', 'United States', 'France']
+CITIES = ['montreal', 'Montreal', 'toronto', 'Ottawa', 'gatineau', 'halifax', 'quebec city', 'Vancouver', 'Paris']
+SERVICES = ['Groceries', 'Groceries, Pharmacy', 'Pharmacy', 'Errands', 'Groceries, Errands, Pharmacy']
+TRANSPORT = ['Car', 'Bike', 'Walking', 'Public Transit']
+DAYS = ['Weekdays', 'Weekends', 'Weekdays, Weekends']
+TIMES = ['Morning', 'Afternoon', 'Evening', 'Morning, Evening']
+LANGUAGES = ['English', 'French', 'English, French', 'English, Spanish']
+PAYMENT = ['Cash', 'E-transfer', 'Cash, E-transfer']
+REQUEST_TYPES = ['One-time', 'Recurring']
+
+#south, north, west, east of the area rows are scattered over
+REGIONS = {
+    'quebec-ontario': (43.0, 47.0, -80.0, -71.0),
+    'canada': (42.0, 60.0, -135.0, -55.0),
+    'world': (-55.0, 70.0, -180.0, 180.0),
+}
+
+def _common(n, rng, prefix, region='quebec-ontario'):
+    south, north, west, east = REGIONS[region]
+    seconds = rng.integers(0, 60*60*24*90, size=n)
+    timestamps = pd.Timestamp('2020-03-15') + pd.to_timedelta(np.sort(seconds), unit='s')
+    latitude = np.round(rng.uniform(south, north, size=n), 4).astype(object)
+    longtitude = np.round(rng.uniform(west, east, size=n), 4).astype(object)
+    missing = rng.random(n) < 0.05 #postal codes that failed to geocode
+    latitude[missing] = ''
+    longtitude[missing] = ''
+
+    return {
+        'Timestamp': timestamps.strftime('%m/%d/%Y %H:%M:%S'),
+        'Email Address': [f'{prefix}{i}@example.com' for i in range(n)],
+        'Country': rng.choice(COUNTRIES, size=n),
+        'City/Town': rng.choice(CITIES, size=n),
+        'Type of Services': rng.choice(SERVICES, size=n),
+        'Preferred Day of Week': rng.choice(DAYS, size=n),
+        'Preferred Time of Day': rng.choice(TIMES, size=n),
+        'Languages Spoken': rng.choice(LANGUAGES, size=n),
+        'Reimbursement Method': rng.choice(PAYMENT, size=n),
+        'Latitude': latitude,
+        'Longtitude': longtitude,
+    }
+
+def make_volunteers(n, seed=0, region='quebec-ontario'):
+    '''raw Volunteers worksheet with n rows'''
+    rng = np.random.default_rng(seed)
+    columns = _common(n, rng, 'volunteer', region)
+    columns.update({
+        'Given Name': [f'Volunteer {i}' for i in range(n)],
+        'Mode of Transportation': rng.choice(TRANSPORT, size=n),
+        'Radius': [f'{r}km' for r in rng.choice([1, 2, 5, 10, 25], size=n)],
+        'About Me': rng.choice(['Happy to help!', 'Retired teacher, lives nearby.', ''], size=n),
+        'Health': rng.choice(['Yes', 'Yes', 'Yes', 'No'], size=n),
+        'Availability': rng.choice(['Yes', 'Yes', 'No'], size=n),
+    })
+
+    return pd.DataFrame(columns)
+
+def make_requests(n, seed=1, region='quebec-ontario'):
+    '''raw Requests worksheet with n rows'''
+    rng = np.random.default_rng(seed)
+    columns = _common(n, rng, 'request', region)
+    columns['Type of Request'] = rng.choice(REQUEST_TYPES, size=n)
+
+    return pd.DataFrame(columns)
+
+def make_client(sheet_id, n_volunteers, n_requests, seed=0, region='quebec-ontario'):
+    '''fake_sheets.FakeClient serving a synthetic spreadsheet, a drop-in data source for
+    get_sheets_df, SheetSync.fetch or app.get_client
+    '''
+    return FakeClient({sheet_id: {
+        'Volunteers': make_volunteers(n_volunteers, seed=seed, region=region),
+        'Requests': make_requests(n_requests, seed=seed + 1, region=region),
+    }})
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+MAX_ZOOM = 15 #deepest clustered zoom, points are served as they are past it
+
+def project(lats, lons):
+    '''lat/lon degrees -> web mercator unit square (x east, y south, both in [0, 1])'''
+    x = np.asarray(lons, dtype=float) / 360 + 0.5
+    sin = np.sin(np.radians(np.clip(lats, -85.0511, 85.0511)))
+    y = 0.5 - 0.25 * np.log((1 + sin) / (1 - sin)) / np.pi
+
+    return x, y
+
+def unproject(x, y):
+    '''web mercator unit square -> (lats, lons) in degrees'''
+    lons = (np.asarray(x, dtype=float) - 0.5) * 360
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=float)))))
+
+    return lats, lons
+
+class ClusterLevel:
+    '''the clusters of one zoom level, as parallel arrays sorted by the tile they fall in
+
+    x, y (float32): weighted centroid in the unit square
+    count (uint32): points in the cluster
+    point (int32): position of the point for single-point clusters, -1 otherwise
+    keys (int64): tile key (ty * 2**zoom + tx) of each cluster, ascending
+    '''
+
+    def __init__(self, zoom, x, y, count, point):
+        n = 2**zoom
+        tx = np.clip(np.floor(x * n), 0, n - 1).astype(np.int64)
+        ty = np.clip(np.floor(y * n), 0, n - 1).astype(np.int64)
+        keys = ty * n + tx
+        order = np.argsort(keys, kind='stable')
+
+        self.zoom = zoom
+        self.keys = keys[order]
+        self.x = x[order].astype(np.float32)
+        self.y = y[order].astype(np.float32)
+        self.count = count[order].astype(np.uint32)
+        self.point = point[order].astype(np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.keys, self.x, self.y, self.count, self.point))
+
+    def tile(self, tx, ty):
+        '''positions (into this level's arrays) of the clusters in tile (tx, ty)'''
+        key = ty * 2**self.zoom + tx
+        return np.arange(*np.searchsorted(self.keys, [key, key + 1]))
+
+    def tile_range(self, tx0, tx1, ty0, ty1):
+        '''positions of the clusters in tiles tx0..tx1 x ty0..ty1 (inclusive)'''
+        rows = np.arange(ty0, ty1 + 1, dtype=np.int64) * 2**self.zoom
+        if not len(rows):
+            return np.array([], dtype=np.int64)
+        lo = np.searchsorted(self.keys, rows + tx0, side='left')
+        hi = np.searchsorted(self.keys, rows + tx1, side='right')
+
+        return np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])
+
+class ClusterIndex:
+    '''Hierarchical point clusters, one level per zoom (supercluster-style)
+
+    The leaf level (max_zoom + 1) holds the points themselves. Each lower zoom merges the
+    clusters of the level above that fall in the same radius x radius pixel grid cell at
+    that zoom, so clusters nest from zoom to zoom, and their position is the
+    count-weighted centroid of their children. Everything is precomputed once per data
+    snapshot into flat numpy arrays, and a map tile is served with two binary searches.
+
+    lats, lons (array-like): point coordinates in degrees
+    radius (int): cluster cell size in screen pixels
+    tile_size (int): map tile size in pixels (256 for leaflet)
+    '''
+
+    def __init__(self, lats, lons, min_zoom=0, max_zoom=MAX_ZOOM, radius=60, tile_size=256):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.levels = {}
+
+        x, y = project(lats, lons)
+        count = np.ones(len(x), dtype=np.int64)
+        point = np.arange(len(x), dtype=np.int64)
+        self.levels[max_zoom + 1] = ClusterLevel(max_zoom + 1, x, y, count, point)
+
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            if not len(x):
+                self.levels[zoom] = ClusterLevel(zoom, x, y, count, point)
+                continue
+
+            cell = radius / (tile_size * 2**zoom)
+            ncells = int(np.ceil(1 / cell)) + 1
+            keys = np.floor(x / cell).astype(np.int64) * ncells + np.floor(y / cell).astype(np.int64)
+            _, parent = np.unique(keys, return_inverse=True)
+            parent = parent.ravel()
+
+            c_count = np.bincount(parent, weights=count)
+            c_x = np.bincount(parent, weights=x * count) / c_count
+            c_y = np.bincount(parent, weights=y * count) / c_count
+            c_point = np.full(len(c_count), -1, dtype=np.int64)
+            single = c_count[parent] == 1
+            c_point[parent[single]] = point[single]
+
+            x, y, count, point = c_x, c_y, c_count.astype(np.int64), c_point
+            self.levels[zoom] = ClusterLevel(zoom, x, y, count, point)
+
+    @property
+    def leaf_zoom(self):
+        return self.max_zoom + 1
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels.values())
+
+    def level(self, zoom):
+        return self.levels[int(np.clip(zoom, self.min_zoom, self.leaf_zoom))]
+
+    def tile(self, zoom, tx, ty):
+        '''(level, positions) of the clusters in slippy map tile zoom/tx/ty (zoom <= leaf_zoom)'''
+        level = self.level(zoom)
+        return level, level.tile(tx, ty)
+
+    def bbox(self, zoom, west, south, east, north):
+        '''(level, positions) of the clusters at zoom inside a bounding box in degrees
+        The box must not cross the antimeridian: -180 <= west <= east <= 180.
+        '''
+        level = self.level(zoom)
+        (x0, x1), (y1, y0) = project([south, north], [west, east])
+        n = 2**level.zoom
+        tx0, tx1 = (int(np.clip(np.floor(v * n), 0, n - 1)) for v in (x0, x1))
+        ty0, ty1 = (int(np.clip(np.floor(v * n), 0, n - 1)) for v in (y0, y1))
+
+        positions = level.tile_range(tx0, tx1, ty0, ty1)
+        x, y = level.x[positions], level.y[positions]
+        inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+
+        return level, positions[inside]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''In-memory stand-ins for the pygsheets client, used to exercise the data
+pipeline offline (no google credentials or network needed)
+
+    gc = FakeClient({'sheet-id': {'Volunteers': df_vol, 'Requests': df_req}})
+    df_vol, df_req = get_sheets_df(gc, 'sheet-id')
+'''
+
+import pandas as pd
+
+class FakeWorksheet:
+    '''mimics the subset of pygsheets.Worksheet used by the app
+    Cells are read back as strings like the sheets api's formatted values; calls and
+    cells_read count the traffic a real worksheet would have generated.
+    '''
+
+    def __init__(self, title, df):
+        self.title = title
+        self.df = df.reset_index(drop=True)
+        self.calls = 0
+        self.cells_read = 0
+
+    @property
+    def rows(self):
+        '''grid rows, including the header row'''
+        return len(self.df) + 1
+
+    @property
+    def cols(self):
+        return len(self.df.columns)
+
+    def get_as_df(self, numerize=True, include_tailing_empty=False, **kwargs):
+        '''like pygsheets, rows come back without their trailing empty cells unless
+        include_tailing_empty, and pandas fills the missing cells with None
+        '''
+        self.calls += 1
+        self.cells_read += self.rows * self.cols
+        rows = self.df.values.tolist() if numerize else self.df.astype(str).values.tolist()
+        if not include_tailing_empty:
+            rows = [_trim(row) for row in rows]
+        return pd.DataFrame(rows, columns=self.df.columns)
+
+    def get_values(self, start, end, include_tailing_empty=True, include_tailing_empty_rows=False, **kwargs):
+        '''start, end: 1-indexed inclusive (row, col) tuples'''
+        self.calls += 1
+        values = self._matrix()[start[0]-1:end[0]]
+        values = [row[start[1]-1:end[1]] for row in values]
+        self.cells_read += sum(len(row) for row in values)
+        return values
+
+    def get_row(self, row, include_tailing_empty=True, **kwargs):
+        values = self.get_values((row, 1), (row, self.cols))
+        return values[0] if values else []
+
+    def append_table(self, values, **kwargs):
+        '''append rows (lists of cell values) below the last row'''
+        new = pd.DataFrame(values, columns=self.df.columns)
+        self.df = pd.concat([self.df, new], ignore_index=True)
+
+    def update_row(self, index, values, **kwargs):
+        '''overwrite sheet row index (1-indexed, the header is row 1)'''
+        self.df.iloc[index-2] = values
+
+    def delete_rows(self, index, number=1):
+        '''delete number rows starting at sheet row index (1-indexed, the header is row 1)'''
+        self.df = self.df.drop(self.df.index[index-2:index-2+number]).reset_index(drop=True)
+
+    def _matrix(self):
+        return [list(self.df.columns)] + self.df.astype(str).values.tolist()
+
+def _trim(row):
+    '''row without its trailing empty cells'''
+    end = len(row)
+    while end and str(row[end-1]) == '':
+        end -= 1
+    return row[:end]
+
+class FakeSpreadsheet:
+    '''mimics pygsheets.Spreadsheet.worksheet_by_title
+    '''
+
+    def __init__(self, sheet_id, worksheets):
+        self.id = sheet_id
+        self.worksheets = {title: FakeWorksheet(title, df) for title, df in worksheets.items()}
+
+    def worksheet_by_title(self, title):
+        if title not in self.worksheets:
+            raise KeyError(f'worksheet {title!r} not found in {self.id!r}')
+        return self.worksheets[title]
+
+class FakeClient:
+    '''mimics pygsheets.client.Client.open_by_key
+    sheets (dict): {sheet_id: {worksheet title: dataframe}}
+    '''
+
+    def __init__(self, sheets):
+        self.sheets = {key: FakeSpreadsheet(key, worksheets) for key, worksheets in sheets.items()}
+        self.calls = 0
+
+    def open_by_key(self, key):
+        self.calls += 1
+        if key not in self.sheets:
+            raise KeyError(f'spreadsheet {key!r} not found')
+        return self.sheets[key]
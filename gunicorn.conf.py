@@ -0,0 +1,16 @@
+# gunicorn settings (web: gunicorn --config gunicorn.conf.py app:server)
+
+import os
+
+#import the app once in the master; workers fork with the modules already loaded
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+#threads let a worker keep serving (cached maps, api calls) while a slow render is in flight
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+def post_fork(server, worker):
+    '''warm the snapshot and map caches before the worker accepts connections
+    (bounded by VA_WARMUP_TIMEOUT, which must stay below gunicorn's worker timeout)
+    '''
+    from app import init_worker
+    init_worker()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from jinja2 import Template
+
+from branca.element import CssLink
+
+from folium.map import Layer
+from folium.plugins import MarkerCluster
+
+class GeoJsonMarkerCluster(MarkerCluster):
+    '''MarkerCluster that fetches its markers from a GeoJSON url in the browser
+    instead of having every marker serialized into the map html.
+
+    Each feature becomes an L.circle with radius feature.properties.r (metres)
+    and a popup built from feature.properties.popup.
+
+    url (str): GeoJSON FeatureCollection endpoint (relative urls resolve against the dash app)
+    color (str): circle stroke and fill color
+    '''
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.markerClusterGroup(
+                {{ this.options|tojson }}
+            );
+            {{ this._parent.get_name() }}.addLayer({{ this.get_name() }});
+
+            fetch({{ this.url|tojson }}, {credentials: 'same-origin'})
+                .then(function(response) { return response.json(); })
+                .then(function(data) {
+                    var markers = data.features.map(function(feature) {
+                        var coords = feature.geometry.coordinates;
+                        return L.circle([coords[1], coords[0]], {
+                            radius: feature.properties.r,
+                            color: {{ this.color|tojson }},
+                            fill: true,
+                            fillColor: {{ this.color|tojson }}
+                        }).bindPopup(feature.properties.popup, {maxWidth: 260, minWidth: 260});
+                    });
+                    {{ this.get_name() }}.addLayers(markers);
+                });
+        {% endmacro %}
+        """)
+
+    def __init__(self, url, color, **kwargs):
+        super(GeoJsonMarkerCluster, self).__init__(**kwargs)
+        self._name = 'GeoJsonMarkerCluster'
+        self.url = url
+        self.color = color
+
+class ClusterTileLayer(Layer):
+    '''Layer that draws the precomputed clusters of spatial.MarkerIndex.tile, fetched per
+    slippy map tile. Tile urls only depend on the data version, so they are cached by the
+    browser and shared by every visitor through any HTTP cache in between.
+
+    url (str): tile endpoint with {z}, {x} and {y} placeholders
+    color (str): circle stroke and fill color
+    max_zoom (int): deepest zoom the endpoint serves; deeper map zooms reuse its tiles
+    '''
+
+    _template = Template(u"""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.layerGroup();
+            {{ this._parent.get_name() }}.addLayer({{ this.get_name() }});
+
+            (function(layer, map) {
+                var latest = 0, tiles = {};
+                function clusterIcon(count) {
+                    var size = count < 10 ? 'small' : count < 100 ? 'medium' : 'large';
+                    return L.divIcon({
+                        html: '<div><span>' + count + '</span></div>',
+                        className: 'marker-cluster marker-cluster-' + size,
+                        iconSize: L.point(40, 40)
+                    });
+                }
+                function getTile(url) {
+                    if (!tiles[url]) {
+                        tiles[url] = fetch(url, {credentials: 'same-origin'})
+                            .then(function(response) {
+                                if (!response.ok) { throw new Error(response.status); }
+                                return response.json();
+                            })
+                            .catch(function() {
+                                delete tiles[url]; //fetched again on the next refresh
+                                return {markers: [], clusters: []}; //the other tiles still draw
+                            });
+                    }
+                    return tiles[url];
+                }
+                function refresh() {
+                    if (!map.hasLayer(layer)) { return; }
+                    var request = ++latest;
+                    var z = Math.min(map.getZoom(), {{ this.max_zoom }}), n = Math.pow(2, z);
+                    var scale = map.getZoomScale(z, map.getZoom()) / 256;
+                    var bounds = map.getPixelBounds();
+                    var x0 = Math.floor(bounds.min.x * scale), x1 = Math.floor(bounds.max.x * scale);
+                    var y0 = Math.max(Math.floor(bounds.min.y * scale), 0);
+                    var y1 = Math.min(Math.floor(bounds.max.y * scale), n - 1);
+                    var urls = [];
+                    for (var x = x0; x <= Math.min(x1, x0 + n - 1); x++) {
+                        for (var y = y0; y <= y1; y++) {
+                            urls.push({{ this.url|tojson }}.replace('{z}', z)
+                                .replace('{x}', ((x % n) + n) % n).replace('{y}', y));
+                        }
+                    }
+                    Promise.all(urls.map(getTile)).then(function(results) {
+                        if (request !== latest) { return; } //a newer view was requested meanwhile
+                        layer.clearLayers();
+                        results.forEach(function(data) {
+                            data.clusters.forEach(function(c) {
+                                L.marker([c[0], c[1]], {icon: clusterIcon(c[2])})
+                                    .on('click', function() { map.setView([c[0], c[1]], map.getZoom() + 2); })
+                                    .addTo(layer);
+                            });
+                            data.markers.forEach(function(m) {
+                                L.circle([m.lat, m.lon], {
+                                    radius: m.r,
+                                    color: {{ this.color|tojson }},
+                                    fill: true,
+                                    fillColor: {{ this.color|tojson }}
+                                }).bindPopup(m.popup, {maxWidth: 260, minWidth: 260}).addTo(layer);
+                            });
+                        });
+                    });
+                }
+                map.on('moveend', refresh);
+                map.on('overlayadd', refresh);
+                refresh();
+            })({{ this.get_name() }}, {{ this._parent.get_name() }});
+        {% endmacro %}
+        """)
+
+    def __init__(self, url, color, max_zoom=16, name=None, overlay=True, control=True, show=True):
+        super(ClusterTileLayer, self).__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'ClusterTileLayer'
+        self.url = url
+        self.color = color
+        self.max_zoom = max_zoom
+
+    def render(self, **kwargs):
+        super(ClusterTileLayer, self).render(**kwargs)
+
+        #cluster icon styles
+        figure = self.get_root()
+        figure.header.add_child(
+            CssLink('https://cdnjs.cloudflare.com/ajax/libs/leaflet.markercluster/1.1.0/MarkerCluster.Default.css'),
+            name='markerclusterdefaultcss')
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import re
+from functools import lru_cache
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from jinja2 import Environment
+from markupsafe import Markup, escape
+
+from translations import translator
+
+VA_EMAIL = 'volunteers.atlas@gmail.com'
+VOLUNTEER_FORM_URL = 'https://docs.google.com/forms/d/e/1FAIpQLSfw3LFsXtCCmr-ewkUuIltKIP5PKNY8Xn8h3MjVrFrvfvktPw/viewform?embedded=true'
+
+MARKER_COLORS = {'Volunteers':'#00d700', 'Requests':'#d77a00'}
+DENSE_CITIES = ['Montreal','Toronto','Ottawa','Montréal','Cote St Luc','Gatineau'] #HACK: make people outside major clusters reflect their true radius
+DENSE_RADIUS = 250 #m
+
+#popup html per category; rendered once per language by get_popup_format, labels go through t()
+POPUP_TEMPLATES = {
+    'Volunteers': u"""
+        <div style='font-size:14px;font-family:sans-serif'><b>{{ t('Volunteers') }}</b> <br>
+        <b>{{ t('Name') }}:</b> {{ f.name }} <br>
+        <b>{{ t('Country') }}:</b> {{ f.country }} <br>
+        <b>{{ t('City') }}:</b> {{ f.city }} <br>
+        <b>{{ t('Services') }}:</b> {{ f.services }} <br>
+        <b>{{ t('Transportation') }}:</b> {{ f.transport }} <br>
+        <b>{{ t('Radius') }}:</b> {{ f.radius }} km <br>
+        <b>{{ t('Day of Week') }}:</b> {{ f.days }} <br>
+        <b>{{ t('Time of Day') }}:</b> {{ f.times }} <br>
+        <b>{{ t('Languages') }}:</b> {{ f.languages }} <br>
+        <b>{{ t('Payment') }}:</b> {{ f.payment }} <br>
+        <b>{{ t('About Me') }}:</b> {{ f.about }} <br>
+        <a href='mailto:{{ f.email }}?cc={{ va_email }}&Subject={{ f.subject }}' target='_blank'>Contact {{ f.name }}</a>  <br></div>
+        """,
+    'Requests': u"""
+        <div style='font-size:14px;font-family:sans-serif'><b>{{ t('Requests') }}</b> <br>
+        <b>{{ t('Country') }}:</b> {{ f.country }} <br>
+        <b>{{ t('City') }}:</b> {{ f.city }} <br>
+        <b>{{ t('Services') }}:</b> {{ f.services }} <br>
+        <b>{{ t('Type') }}:</b> {{ f.type }} <br>
+        <b>{{ t('Day of Week') }}:</b> {{ f.days }} <br>
+        <b>{{ t('Time of Day') }}:</b> {{ f.times }} <br>
+        <b>{{ t('Languages') }}:</b> {{ f.languages }} <br>
+        <b>{{ t('Payment') }}:</b> {{ f.payment }} <br>
+        <a href='{{ form_url }}' target='_blank'>Sign Up to Help</a>  <br></div>
+        """,
+}
+
+#template field -> sheet column
+POPUP_FIELDS = {
+    'Volunteers': {
+        'name': 'Given Name', 'country': 'Country', 'city': 'City/Town', 'services': 'Type of Services',
+        'transport': 'Mode of Transportation', 'radius': 'Radius', 'days': 'Preferred Day of Week',
+        'times': 'Preferred Time of Day', 'languages': 'Languages Spoken', 'payment': 'Reimbursement Method',
+        'about': 'About Me', 'email': 'Email Address', 'subject': 'Given Name',
+    },
+    'Requests': {
+        'country': 'Country', 'city': 'City/Town', 'services': 'Type of Services', 'type': 'Type of Request',
+        'days': 'Preferred Day of Week', 'times': 'Preferred Time of Day', 'languages': 'Languages Spoken',
+        'payment': 'Reimbursement Method',
+    },
+}
+
+jinja_env = Environment(autoescape=True)
+
+@lru_cache(maxsize=None)
+def get_popup_format(category, language):
+    '''popup html for one category and language as a str.format string with one
+    positional slot per POPUP_FIELDS entry
+
+    The jinja template is rendered once with the translations filled in and placeholders
+    for the fields, so per-marker work is a single str.format call.
+    '''
+    fields = list(POPUP_FIELDS[category])
+    placeholders = {field: Markup(f'\x00{i}\x00') for i, field in enumerate(fields)}
+    html = jinja_env.from_string(POPUP_TEMPLATES[category]).render(
+        t=lambda word: translator(word, language),
+        f=placeholders,
+        va_email=VA_EMAIL,
+        form_url=VOLUNTEER_FORM_URL
+    )
+    html = ''.join(line.strip() for line in html.splitlines())
+    html = html.replace('{', '{{').replace('}', '}}')
+
+    return re.sub('\x00(\\d+)\x00', r'{\1}', html)
+
+def escape_column(series, encode=escape):
+    '''encoded (html-escaped by default) string for every value of a column
+    encode runs once per distinct value, which is cheap for categoricals and repeated answers
+    '''
+    codes, uniques = pd.factorize(series.astype(str).to_numpy(dtype=object))
+    encoded = np.array([str(encode(value)) for value in uniques.tolist()], dtype=object)
+
+    return encoded[codes] if len(codes) else encoded[:0]
+
+def quote_column(series):
+    '''url-quoted string for every value of a column
+    Values made only of letters, digits and spaces (most names) skip urllib's per-character quoting.
+    '''
+    values = series.astype(str)
+    quoted = values.str.replace(' ', '%20', regex=False).to_numpy(dtype=object)
+    special = ~values.str.match(r'[A-Za-z0-9 ]*\Z').to_numpy(dtype=bool) #str.fullmatch needs pandas 1.1
+    quoted[special] = [quote(value) for value in values[special].tolist()]
+
+    return quoted
+
+def render_popups(df, category, language):
+    '''popup html for every row of df (already filtered by get_marker_df)
+    Sheet values are html-escaped since popups are no longer sandboxed in their own iframe.
+    '''
+    columns = []
+    for field, column in POPUP_FIELDS[category].items():
+        series = df[column]
+        if field == 'radius':
+            columns.append(series.astype(int).astype(str).to_numpy())
+        elif field == 'subject':
+            columns.append('Delivery%20Request%20for%20' + quote_column(series))
+        else:
+            columns.append(escape_column(series))
+
+    fmt = get_popup_format(category, language).format
+
+    return [fmt(*values) for values in zip(*columns)]
+
+def get_marker_df(df, category):
+    '''rows of df that get a marker on the map: geocoded, and for volunteers healthy and available
+    '''
+    mask = df['Latitude'].notna().to_numpy() & df['Longtitude'].notna().to_numpy()
+
+    if category == 'Volunteers':
+        mask &= (df['Health'] == 'Yes').to_numpy() & (df['Availability'] == 'Yes').to_numpy() \
+            & df['Radius'].notna().to_numpy()
+
+    return df.loc[mask]
+
+def get_marker_radius(df, category):
+    '''circle radius in metres for every row of df'''
+    if category == 'Volunteers':
+        return np.where(df['City/Town'].isin(DENSE_CITIES), DENSE_RADIUS, df['Radius'].to_numpy()*1000)
+    else:
+        return np.full(len(df), DENSE_RADIUS)
+
+def build_feature_collection(df, category, language):
+    '''GeoJSON FeatureCollection of the markers for one category
+    Each point carries its circle radius (r, metres) and popup html (popup).
+    '''
+    dff = get_marker_df(df, category)
+
+    lons = dff['Longtitude'].round(5).tolist()
+    lats = dff['Latitude'].round(5).tolist()
+    radii = get_marker_radius(dff, category).tolist()
+    popups = render_popups(dff, category, language)
+
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'r': r, 'popup': popup}
+        }
+        for lon, lat, r, popup in zip(lons, lats, radii, popups)
+    ]
+
+    return {'type': 'FeatureCollection', 'features': features}
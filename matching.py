@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+import pandas as pd
+
+from markers import get_marker_df
+
+EARTH_RADIUS_KM = 6371.0088
+
+#multi-select form answers compared between volunteers and requests
+MATCH_ATTRIBUTES = ['Languages Spoken', 'Type of Services', 'Preferred Day of Week', 'Preferred Time of Day']
+REQUIRED_ATTRIBUTES = ['Languages Spoken'] #no match without a common language
+
+#popcount of every 16 bit value, numpy has no vectorized popcount before 2.0
+POPCOUNT16 = np.array([bin(i).count('1') for i in range(1 << 16)], dtype=np.uint8)
+
+def popcount(x):
+    '''set bits of each uint64 mask, summed over the last axis (the words of a row)'''
+    x = np.asarray(x, dtype=np.uint64)
+    counts = sum(POPCOUNT16[(x >> np.uint64(shift)) & np.uint64(0xffff)].astype(np.int64) for shift in (0, 16, 32, 48))
+
+    return counts.sum(axis=-1)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    '''great circle distance; arguments in degrees, broadcast like numpy arrays'''
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def split_choices(value):
+    '''"English, French" -> {'english', 'french'}'''
+    return {choice.strip().lower() for choice in str(value).split(',') if choice.strip()}
+
+def as_strings(series):
+    '''object strings of a column, '' for missing values (categorical columns included)'''
+    return series.astype(object).fillna('').astype(str)
+
+def encode_choices(series, vocabulary):
+    '''bitmasks of the choices in each row of a multi-select column
+    returns (masks, counts): masks is a (rows, words) uint64 array with one bit per vocabulary
+    entry, counts the number of choices of each row, including ones outside the vocabulary
+    (which get no bit, so they never match anything). The string parsing runs once per
+    distinct answer, not once per row.
+    '''
+    codes, uniques = pd.factorize(as_strings(series))
+    words = max(1, -(-len(vocabulary) // 64))
+    masks = np.zeros((len(uniques), words), dtype=np.uint64)
+    counts = np.zeros(len(uniques), dtype=np.int64)
+    for i, value in enumerate(uniques):
+        choices = split_choices(value)
+        counts[i] = len(choices)
+        for choice in choices:
+            bit = vocabulary.get(choice)
+            if bit is not None:
+                masks[i, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+
+    if not len(codes):
+        return masks[:0], counts[:0]
+    return masks[codes], counts[codes]
+
+def build_vocabulary(*series):
+    '''choice -> bit position, most common choices first'''
+    counts = {}
+    for s in series:
+        for value, n in as_strings(s).value_counts().items():
+            for choice in split_choices(value):
+                counts[choice] = counts.get(choice, 0) + n
+
+    return {choice: i for i, choice in enumerate(sorted(counts, key=counts.get, reverse=True))}
+
+class Matcher:
+    '''Ranks available volunteers for delivery requests
+
+    A volunteer matches a request when the request lies within the volunteer's Radius (km)
+    and they share every REQUIRED_ATTRIBUTES choice set. Matches are scored by proximity
+    (1 at the volunteer's location, 0 at the edge of their radius) plus the fraction of the
+    request's choices the volunteer covers for each of MATCH_ATTRIBUTES.
+
+    Distances are computed as a dense (chunk x volunteers) haversine matrix, one chunk of
+    requests at a time, so memory stays bounded and there is no python loop over pairs.
+
+    df_vol (DataFrame): processed volunteers, filtered to the ones shown on the map
+    chunk (int): requests per distance matrix block
+    '''
+
+    def __init__(self, df_vol, chunk=512):
+        self.vol = get_marker_df(df_vol, 'Volunteers')
+        self.chunk = chunk
+        self.lats = self.vol['Latitude'].to_numpy(dtype=float)
+        self.lons = self.vol['Longtitude'].to_numpy(dtype=float)
+        self.radius_km = self.vol['Radius'].to_numpy(dtype=float)
+        self.vocabulary = {
+            attr: build_vocabulary(self.vol[attr]) for attr in MATCH_ATTRIBUTES if attr in self.vol
+        }
+        self.masks = {attr: encode_choices(self.vol[attr], vocab)[0] for attr, vocab in self.vocabulary.items()}
+
+    def __len__(self):
+        return len(self.vol)
+
+    def match(self, df_req, top_k=5):
+        '''ranked volunteers for every geocoded request
+        returns a DataFrame: request_id, volunteer_id, rank (1 = best), distance_km, score
+        ids are index labels of df_req and of the volunteers dataframe
+        '''
+        req = df_req.dropna(subset=['Latitude', 'Longtitude'])
+        req_lats = req['Latitude'].to_numpy(dtype=float)
+        req_lons = req['Longtitude'].to_numpy(dtype=float)
+        req_masks = {
+            attr: encode_choices(req[attr], vocab) for attr, vocab in self.vocabulary.items() if attr in req
+        }
+
+        blocks = []
+        for start in range(0, len(req), self.chunk):
+            stop = min(start + self.chunk, len(req))
+            distances = haversine_km(
+                req_lats[start:stop, None], req_lons[start:stop, None], self.lats[None, :], self.lons[None, :]
+            )
+            r, v = np.nonzero(distances <= self.radius_km[None, :]) #candidate pairs, positions
+            d = distances[r, v]
+            r += start
+
+            keep = np.ones(len(r), dtype=bool)
+            score = 1 - d / np.maximum(self.radius_km[v], 1e-9)
+            for attr, (masks, counts) in req_masks.items():
+                wanted = counts[r]
+                shared = popcount(masks[r] & self.masks[attr][v])
+                if attr in REQUIRED_ATTRIBUTES:
+                    keep &= (shared > 0) | (wanted == 0) #requests that left it blank match anyone
+                score = score + np.where(wanted > 0, shared / np.maximum(wanted, 1), 0)
+
+            blocks.append((r[keep], v[keep], d[keep], score[keep]))
+
+        if blocks:
+            r, v, d, score = (np.concatenate(parts) for parts in zip(*blocks))
+        else:
+            r = v = np.array([], dtype=int)
+            d = score = np.array([], dtype=float)
+
+        matches = pd.DataFrame({
+            'request_id': req.index.to_numpy()[r],
+            'volunteer_id': self.vol.index.to_numpy()[v],
+            'distance_km': d,
+            'score': score
+        })
+        matches = matches.sort_values(['request_id', 'score', 'distance_km'], ascending=[True, False, True])
+        matches['rank'] = matches.groupby('request_id').cumcount() + 1
+
+        return matches.loc[matches['rank'] <= top_k, ['request_id', 'volunteer_id', 'rank', 'distance_km', 'score']]\
+            .reset_index(drop=True)
+
+    def nearest(self, lat, lon, k=5):
+        '''k closest volunteers to a point, regardless of their radius
+        returns a DataFrame of volunteer_id, distance_km
+        '''
+        distances = haversine_km(lat, lon, self.lats, self.lons)
+        nearest = np.argsort(distances)[:k]
+
+        return pd.DataFrame({'volunteer_id': self.vol.index.to_numpy()[nearest], 'distance_km': distances[nearest]})
+
+    def covering(self, lat, lon):
+        '''volunteers whose radius covers a point, closest first
+        returns a DataFrame of volunteer_id, distance_km
+        '''
+        distances = haversine_km(lat, lon, self.lats, self.lons)
+        inside = np.nonzero(distances <= self.radius_km)[0]
+        inside = inside[np.argsort(distances[inside])]
+
+        return pd.DataFrame({'volunteer_id': self.vol.index.to_numpy()[inside], 'distance_km': distances[inside]})
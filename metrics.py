@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import re
+import time
+import hmac
+import bisect
+import pstats
+import cProfile
+import tempfile
+import logging
+import threading
+from contextlib import contextmanager
+
+import flask
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+COUNT_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+class Metrics:
+    '''In-process counters, gauges and histograms, rendered in the Prometheus text format
+
+    Metrics are declared once with their type and help text, then updated with label
+    keyword arguments. Values that already live elsewhere (cache hit counters, snapshot age)
+    are read at scrape time by collectors registered with add_collector.
+
+        metrics.declare('stage_seconds', 'histogram', 'time spent in each pipeline stage')
+        with metrics.span('process_df', worksheet='Volunteers'):
+            ...
+
+    Each gunicorn worker keeps its own values: scrape workers individually (the pid label
+    on process_start_time_seconds tells them apart) or sum them in the query.
+
+    prefix (str): prepended to every metric name
+    '''
+
+    def __init__(self, prefix='volunteeratlas'):
+        self.prefix = prefix
+        self._types = {}
+        self._help = {}
+        self._buckets = {}
+        self._values = {} #{name: {labels tuple: value, or [bucket counts, sum, count] for histograms}}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def declare(self, name, kind, help, buckets=SECONDS_BUCKETS):
+        '''kind: 'counter', 'gauge' or 'histogram' '''
+        self._types[name] = kind
+        self._help[name] = help
+        self._buckets[name] = tuple(buckets)
+        self._values.setdefault(name, {})
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[name][_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        buckets = self._buckets[name]
+        with self._lock:
+            values = self._values[name]
+            state = values.get(key)
+            if state is None:
+                state = values[key] = [[0] * len(buckets), 0.0, 0]
+            i = bisect.bisect_left(buckets, value)
+            if i < len(buckets):
+                state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def span(self, stage, **labels):
+        '''time the enclosed block into stage_seconds{stage=...}'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+    def add_collector(self, collect):
+        '''collect(metrics) is called before every render to set gauges from live state'''
+        self._collectors.append(collect)
+
+    def render(self):
+        '''all metrics in the Prometheus text exposition format (version 0.0.4)'''
+        for collect in self._collectors:
+            try:
+                collect(self)
+            except Exception:
+                logger.exception('metrics collector %r failed', collect)
+
+        lines = []
+        with self._lock:
+            for name in sorted(self._values):
+                full = f'{self.prefix}_{name}'
+                kind = self._types[name]
+                lines.append(f'# HELP {full} {self._help[name]}')
+                lines.append(f'# TYPE {full} {kind}')
+                for key, value in sorted(self._values[name].items()):
+                    if kind != 'histogram':
+                        lines.append(f'{full}{_format_labels(key)} {_format_value(value)}')
+                        continue
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, n in zip(self._buckets[name], counts):
+                        cumulative += n
+                        lines.append(f'{full}_bucket{_format_labels(key, le=_format_value(bound))} {cumulative}')
+                    lines.append(f'{full}_bucket{_format_labels(key, le="+Inf")} {count}')
+                    lines.append(f'{full}_sum{_format_labels(key)} {_format_value(total)}')
+                    lines.append(f'{full}_count{_format_labels(key)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key, **extra):
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+
+    return '{' + ','.join(escaped) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+metrics = Metrics()
+metrics.declare('stage_seconds', 'histogram', 'Time spent in each stage of the fetch/process/render pipeline.')
+metrics.declare('request_seconds', 'histogram', 'HTTP request latency by route.')
+metrics.declare('payload_bytes', 'histogram', 'Uncompressed size of each rendered payload.', buckets=BYTES_BUCKETS)
+metrics.declare('payload_markers', 'histogram', 'Markers in each rendered payload.', buckets=COUNT_BUCKETS)
+metrics.declare('payload_clusters', 'histogram', 'Clusters in each rendered payload.', buckets=COUNT_BUCKETS)
+metrics.declare('renders_total', 'counter', 'Payloads rendered, by kind.')
+metrics.declare('sheet_syncs_total', 'counter', 'Worksheet syncs, full downloads or appended rows only.')
+metrics.declare('cache_hits_total', 'counter', 'Cache lookups that found an entry.')
+metrics.declare('cache_misses_total', 'counter', 'Cache lookups that did not find an entry.')
+metrics.declare('cache_bytes', 'gauge', 'Bytes stored in each cache.')
+metrics.declare('cache_entries', 'gauge', 'Entries stored in each cache.')
+metrics.declare('process_start_time_seconds', 'gauge', 'Unix time this worker started.')
+
+def profile_mode():
+    '''VA_PROFILE: unset/'' (off), 'header' (requests whose X-Profile header is VA_PROFILE_TOKEN)
+    or 'all' '''
+    return os.environ.get('VA_PROFILE', '').lower()
+
+def has_profile_token():
+    '''True if the request carries the VA_PROFILE_TOKEN secret; never without a token set'''
+    token = os.environ.get('VA_PROFILE_TOKEN', '')
+    sent = flask.request.headers.get('X-Profile', '')
+
+    return bool(token) and hmac.compare_digest(sent.encode(), token.encode())
+
+def prune_profiles(profile_dir, keep):
+    '''delete all but the newest keep profile dumps'''
+    paths = [os.path.join(profile_dir, name) for name in os.listdir(profile_dir) if name.endswith('.prof')]
+    for path in sorted(paths, key=os.path.getmtime)[:-keep or None]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass #another worker pruned it
+
+def profile_task(fn):
+    '''fn, profiled into the current request's dump when that request is being profiled
+    The request profiler only sees its own thread, so work handed to a pool (map renders,
+    matching) would otherwise show up as a blocked future.result(). A build the request
+    joins instead of starting (already in flight) is not profiled.
+    '''
+    if not flask.has_request_context() or 'profiler' not in flask.g:
+        return fn
+    tasks = flask.g.setdefault('task_profiles', [])
+
+    def run():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError: #another profiler is active in this interpreter (python 3.12+)
+            return fn()
+        try:
+            return fn()
+        finally:
+            profiler.disable()
+            tasks.append(profiler)
+
+    return run
+
+def instrument_server(server, profile_dir=None):
+    '''time every request into request_seconds{route}, and cProfile requests when VA_PROFILE
+    is set. Profiles are written to profile_dir (VA_PROFILE_DIR, default the temp directory)
+    as pstats dumps, keeping the newest VA_PROFILE_KEEP (default 50), including the renders the
+    request ran on render_pool (see profile_task). Requests that sent the
+    VA_PROFILE_TOKEN get the name of their dump in the X-Profile-File response header:
+
+        curl -H "X-Profile: $VA_PROFILE_TOKEN" -D - http://.../en
+        python -m pstats /tmp/volunteeratlas-profiles/<file>.prof
+    '''
+    profile_dir = profile_dir or os.environ.get('VA_PROFILE_DIR') or \
+        os.path.join(tempfile.gettempdir(), 'volunteeratlas-profiles')
+    keep = int(os.environ.get('VA_PROFILE_KEEP', 50))
+
+    @server.before_request
+    def start_request():
+        flask.g.request_started = time.perf_counter()
+        mode = profile_mode()
+        if mode == 'all' or (mode == 'header' and has_profile_token()):
+            flask.g.profiler = cProfile.Profile()
+            flask.g.profiler.enable()
+
+    @server.after_request
+    def finish_request(response):
+        profiler = flask.g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            for task in list(flask.g.pop('task_profiles', [])): #pool builds that finished in time
+                stats.add(task)
+            os.makedirs(profile_dir, exist_ok=True)
+            name = re.sub(r'[^A-Za-z0-9_.-]+', '_', flask.request.path).strip('_') or 'index'
+            path = os.path.join(profile_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{name}.prof')
+            stats.dump_stats(path)
+            prune_profiles(profile_dir, keep)
+            if has_profile_token():
+                response.headers['X-Profile-File'] = os.path.basename(path)
+
+        started = flask.g.pop('request_started', None)
+        if started is not None:
+            rule = flask.request.url_rule
+            metrics.observe(
+                'request_seconds', time.perf_counter() - started,
+                route=rule.rule if rule is not None else 'unmatched', status=response.status_code
+            )
+
+        return response
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import gzip
+import threading
+from collections import OrderedDict
+
+class RenderCache:
+    '''LRU cache of rendered map html keyed by (data version, language)
+
+    Entries are stored gzip-compressed by default (map html compresses ~10x),
+    and the least recently used ones are evicted once the cache exceeds max_bytes.
+
+    max_bytes (int): upper bound on the stored (possibly compressed) size
+    compress (bool): store entries gzip-compressed
+    '''
+
+    def __init__(self, max_bytes=64*1024*1024, compress=True):
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        '''return the cached html for key, or None'''
+        blob = self._lookup(key)
+
+        return None if blob is None else self._decode(blob)
+
+    def put(self, key, html):
+        self._put_blob(key, self._encode(html))
+
+    def get_or_build(self, key, build):
+        '''return the cached html for key, calling build() to render it on a miss'''
+        html = self.get(key)
+        if html is None:
+            html = build()
+            self.put(key, html)
+
+        return html
+
+    def get_or_build_gzip(self, key, build):
+        '''like get_or_build, but return the stored gzip bytes so they can be sent without
+        recompressing (requires compress=True)
+        '''
+        blob = self._lookup(key)
+        if blob is None:
+            blob = self._encode(build())
+            self._put_blob(key, blob)
+
+        return blob
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        return blob
+
+    def _put_blob(self, key, blob):
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= len(self._entries.pop(key))
+            self._entries[key] = blob
+            self.nbytes += len(blob)
+
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def _encode(self, html):
+        data = html.encode('utf-8')
+        return gzip.compress(data, compresslevel=6) if self.compress else data
+
+    def _decode(self, blob):
+        return (gzip.decompress(blob) if self.compress else blob).decode('utf-8')
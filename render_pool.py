@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+class RenderPool:
+    '''Bounded thread pool for slow renders, with request coalescing and a stale fallback
+
+    Concurrent calls for the same key share one in-flight build (single-flight). A caller
+    waits at most timeout seconds; after that it gets the last good result, if there is one,
+    while the build carries on and refreshes it for later callers. Every finished build
+    counts, whether it was started by run() or by a background submit().
+
+    max_workers (int): builds running at the same time
+    timeout (float): seconds a caller waits before falling back to the last good result
+    fallback_key (callable): maps a key to the slot its last good result is kept in, e.g.
+        lambda key: key[1] so a (data version, language) render falls back to the previous
+        version's map in the same language
+    '''
+
+    def __init__(self, max_workers=2, timeout=10, fallback_key=None):
+        self.timeout = timeout
+        self.fallback_key = fallback_key or (lambda key: key)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='render')
+        self.builds = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+
+        self._inflight = {}
+        self._last_good = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, build):
+        '''future for build(), reusing the in-flight one for key if there is one'''
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self.executor.submit(build)
+            self._inflight[key] = future
+            self.builds += 1
+        future.add_done_callback(lambda f: self._done(key, f))
+
+        return future
+
+    def run(self, key, build, timeout=None):
+        '''result of build() for key, or the last good one if it takes longer than timeout
+        Without a last good result the caller waits for the build however long it takes.
+        '''
+        future = self.submit(key, build)
+        slot = self.fallback_key(key)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            if slot in self._last_good:
+                self.fallbacks += 1
+                logger.warning('render of %r is slow, serving the last good result', key)
+                return self._last_good[slot]
+            return future.result()
+        except Exception:
+            if slot in self._last_good:
+                self.fallbacks += 1
+                logger.exception('render of %r failed, serving the last good result', key)
+                return self._last_good[slot]
+            raise
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        if not future.cancelled() and future.exception() is None:
+            self._last_good[self.fallback_key(key)] = future.result()
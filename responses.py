@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import gzip
+
+from flask import Response, request
+
+def cached_response(body_gz, etag, last_modified=None, mimetype='application/json', max_age=60):
+    '''build a conditional, cacheable response from a gzip-compressed body
+
+    body_gz (bytes): gzip-compressed payload, sent as-is to clients that accept gzip
+    etag (str): strong validator for the payload, e.g. derived from the data version
+    last_modified (float): unix time the underlying data was fetched
+    max_age (int): seconds browsers and proxies may reuse the response without revalidating
+    '''
+    accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = Response(body_gz if accepts_gzip else gzip.decompress(body_gz), mimetype=mimetype)
+    if accepts_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+
+    response.set_etag(etag + '-gz' if accepts_gzip else etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+
+    return response.make_conditional(request)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import time
+import hashlib
+import logging
+
+import pandas as pd
+
+from sheets import process_volunteers, process_requests, concat_processed
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def row_fingerprint(values, ncols):
+    '''hash of one sheet row, padded to ncols so trailing empty cells don't matter'''
+    values = [str(v) for v in values][:ncols]
+    values += [''] * (ncols - len(values))
+
+    return hashlib.sha1('\x1f'.join(values).encode()).hexdigest()
+
+class WorksheetSync:
+    '''Incrementally mirrors one append-only worksheet (google forms responses) into a
+    processed dataframe
+
+    Each sync checks that the last row seen so far is unchanged and then only downloads
+    the rows appended after it. A full download is done on the first sync, whenever that
+    check fails (edits or deletions shifted the rows) and every reconcile_interval
+    seconds, to pick up edits anywhere else in the sheet.
+
+    title (str): worksheet title
+    process (callable): turns a raw get_as_df-style dataframe into the processed one
+    reconcile_interval (float): seconds between forced full downloads
+    '''
+
+    def __init__(self, title, process, reconcile_interval=3600):
+        self.title = title
+        self.process = process
+        self.reconcile_interval = reconcile_interval
+
+        self.df = None
+        self.header = None
+        self.nrows = 0 #data rows mirrored so far (sheet rows 2..nrows+1)
+        self.fingerprint = None #of sheet row nrows+1
+        self.reconciled_at = 0.0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+
+    def sync(self, worksheet):
+        '''bring self.df up to date with worksheet and return it'''
+        if self.df is None or time.time() - self.reconciled_at > self.reconcile_interval:
+            return self.full_sync(worksheet)
+
+        if self.nrows > 0:
+            last_row = worksheet.get_row(self.nrows + 1, include_tailing_empty=True)
+            if row_fingerprint(last_row, len(self.header)) != self.fingerprint:
+                logger.info('%s: rows were edited or deleted, doing a full sync', self.title)
+                return self.full_sync(worksheet)
+
+        start = self.nrows + 2
+        if worksheet.rows < start:
+            return self.df
+
+        with metrics.span('get_values', worksheet=self.title):
+            values = worksheet.get_values(
+                (start, 1), (worksheet.rows, len(self.header)),
+                include_tailing_empty=True, include_tailing_empty_rows=False
+            )
+        values = [row for row in values if any(str(v) != '' for v in row)]
+        if not values:
+            return self.df
+
+        ncols = len(self.header)
+        raw = pd.DataFrame(
+            [[str(v) for v in row][:ncols] + [''] * (ncols - len(row)) for row in values],
+            columns=self.header
+        )
+        with metrics.span('process_df', worksheet=self.title):
+            self.df = concat_processed(self.df, self.process(raw))
+        self.nrows += len(values)
+        self.fingerprint = row_fingerprint(values[-1], ncols)
+        self.incremental_syncs += 1
+        metrics.inc('sheet_syncs_total', worksheet=self.title, kind='incremental')
+
+        return self.df
+
+    def full_sync(self, worksheet):
+        '''download and process the whole worksheet'''
+        with metrics.span('get_as_df', worksheet=self.title):
+            raw = worksheet.get_as_df(numerize=False) #strings, like get_values, so both paths process alike
+        raw = raw.fillna('') #get_as_df drops trailing empty cells, which pandas fills with None
+        self.header = list(raw.columns)
+        self.nrows = len(raw)
+        self.fingerprint = row_fingerprint(raw.iloc[-1].tolist(), len(self.header)) if len(raw) else None
+        with metrics.span('process_df', worksheet=self.title):
+            self.df = self.process(raw)
+        self.reconciled_at = time.time()
+        self.full_syncs += 1
+        metrics.inc('sheet_syncs_total', worksheet=self.title, kind='full')
+
+        return self.df
+
+class SheetSync:
+    '''Incremental replacement for sheets.get_sheets_df(gc, sheet_id)
+
+        sync = SheetSync(sheet_id)
+        df_vol, df_req = sync.fetch(gc) #full download the first time, appended rows afterwards
+    '''
+
+    def __init__(self, sheet_id, reconcile_interval=3600):
+        self.sheet_id = sheet_id
+        self.volunteers = WorksheetSync('Volunteers', process_volunteers, reconcile_interval)
+        self.requests = WorksheetSync('Requests', process_requests, reconcile_interval)
+
+    def fetch(self, gc):
+        with metrics.span('sheets_open'):
+            sh = gc.open_by_key(self.sheet_id)
+        df_vol = self.volunteers.sync(sh.worksheet_by_title(self.volunteers.title))
+        df_req = self.requests.sync(sh.worksheet_by_title(self.requests.title))
+
+        return df_vol, df_req
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import pandas as pd
+import numpy as np
+
+import os
+import hashlib
+
+from metrics import metrics
+
+TIMESTAMP_FORMAT = '%m/%d/%Y %H:%M:%S' #google forms response timestamps
+CATEGORICAL_COLUMNS = ['Country', 'City/Town', 'Type of Services'] #few distinct values repeated across many rows
+
+#secret for the privacy jitter; without it anyone could recompute (and subtract) the offsets
+JITTER_SECRET = os.environ.get('VA_JITTER_KEY', 'volunteeratlas')
+
+def to_category(series, transform=None):
+    '''categorical copy of a string column, applying transform (a vectorized .str method name)
+    to the distinct values only
+    '''
+    codes, uniques = pd.factorize(series.fillna('').astype(str))
+    uniques = pd.Index(uniques)
+    if transform is not None:
+        uniques = getattr(uniques.str, transform)()
+
+    return pd.Series(pd.Categorical(uniques.take(codes)), index=series.index, name=series.name)
+
+def to_timestamp(series):
+    '''parse timestamps with the fixed google forms format, falling back to inference'''
+    try:
+        return pd.to_datetime(series, format=TIMESTAMP_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series)
+
+def get_jitter(df, jitter=0.005, secret=JITTER_SECRET):
+    '''privacy offsets (dlat, dlon) in [-jitter, jitter) degrees, a stable function of each row
+
+    The offsets come from a keyed hash (siphash, vectorized by pandas) of the row's raw
+    Timestamp and Email Address, so a sign-up stays put across fetches and renders
+    while the offsets can't be recomputed without the secret.
+    '''
+    hash_key = hashlib.md5(secret.encode()).hexdigest()[:16] #hash_array wants a 16 byte key
+    row_keys = df['Timestamp'].astype(str)
+    if 'Email Address' in df:
+        row_keys = row_keys + '|' + df['Email Address'].astype(str)
+    h = pd.util.hash_array(row_keys.to_numpy(dtype=object), hash_key=hash_key, categorize=False)
+
+    u_lat = (h >> np.uint64(32)).astype(float) / 2**32
+    u_lon = (h & np.uint64(0xffffffff)).astype(float) / 2**32
+
+    return (2*u_lat - 1)*jitter, (2*u_lon - 1)*jitter
+
+def process_df(df, jitter=0.005):
+    '''process columns common to volunteer and request dataframes
+    jitter (float): max offset in degrees added to each coordinate for privacy, see get_jitter
+    '''
+    dlat, dlon = get_jitter(df, jitter)
+
+    df['Timestamp'] = to_timestamp(df['Timestamp'])
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce').astype(float) + dlat #'' (not geocoded) -> NaN, stays NaN
+    df['Longtitude'] = pd.to_numeric(df['Longtitude'], errors='coerce').astype(float) + dlon
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = to_category(df[column], transform='title' if column == 'City/Town' else None)
+
+    return df
+
+def process_volunteers(df):
+    '''process a raw "Volunteers" worksheet dataframe'''
+    df['Radius'] = pd.to_numeric(df['Radius'].astype(str).str.replace('km', '', regex=False), errors='coerce').astype(float)
+
+    return process_df(df)
+
+def process_requests(df):
+    '''process a raw "Requests" worksheet dataframe'''
+    return process_df(df)
+
+def concat_processed(df, delta):
+    '''append processed rows to a processed dataframe, keeping categorical columns categorical'''
+    out = pd.concat([df, delta], ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in out:
+            out[column] = out[column].astype('category')
+
+    return out
+
+def get_sheets_df(gc, sheet_id):
+    '''get and process google sheets into a dataframe
+    gc: pygsheets client (or anything exposing open_by_key, e.g. fake_sheets.FakeClient)
+    '''
+
+    with metrics.span('sheets_open'):
+        sh = gc.open_by_key(sheet_id)
+    with metrics.span('get_as_df', worksheet='Volunteers'):
+        df1 = sh.worksheet_by_title("Volunteers").get_as_df()
+    with metrics.span('get_as_df', worksheet='Requests'):
+        df2 = sh.worksheet_by_title("Requests").get_as_df()
+
+    with metrics.span('process_df', worksheet='Volunteers'):
+        df_vol = process_volunteers(df1)
+    with metrics.span('process_df', worksheet='Requests'):
+        df_req = process_requests(df2)
+
+    return df_vol, df_req
+
+def data_version(*dfs):
+    '''content hash of one or more dataframes, used to key caches derived from the sheet data
+    '''
+    h = hashlib.sha1()
+    for df in dfs:
+        h.update(repr(list(df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+
+    return h.hexdigest()[:16]
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import time
+import pickle
+import logging
+import tempfile
+import threading
+
+from sheets import data_version
+
+logger = logging.getLogger(__name__)
+
+class SheetSnapshot:
+    '''Stale-while-revalidate cache of the processed (volunteers, requests) dataframes
+
+    The snapshot is pickled to `path` and swapped in atomically, so every gunicorn
+    worker pointing at the same path shares one copy and only one of them (whoever
+    holds the lock file) talks to google sheets per refresh.
+
+    fetch (callable): returns (df_vol, df_req), e.g. lambda: get_sheets_df(gc, sheet_id)
+    path (str): location of the shared snapshot file
+    interval (float): seconds after which a snapshot is stale and gets refreshed
+    lock_timeout (float): seconds after which a leftover lock file is considered dead
+    '''
+
+    def __init__(self, fetch, path, interval=300, lock_timeout=120):
+        self.fetch = fetch
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.interval = interval
+        self.lock_timeout = lock_timeout
+
+        self._current = None #(version, (df_vol, df_req)), swapped as one object
+        self._fetched_at = 0.0
+        self._mtime = None
+        self._listeners = []
+        self._owns_file_lock = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def age(self):
+        '''seconds since the sheet fetch behind the current snapshot'''
+        return time.time() - self._fetched_at
+
+    @property
+    def fetched_at(self):
+        '''unix time of the sheet fetch behind the current snapshot'''
+        return self._fetched_at
+
+    @property
+    def current(self):
+        '''(version, (df_vol, df_req)) if a snapshot exists, else None; never fetches'''
+        self._load()
+        return self._current
+
+    @property
+    def running(self):
+        '''True while the background refresh loop is alive'''
+        return self._thread is not None and self._thread.is_alive()
+
+    def get(self):
+        '''return (df_vol, df_req)
+        Only blocks when there is no snapshot at all; a stale snapshot is returned
+        immediately while a refresh runs in the background.
+        '''
+        return self.versioned()[1]
+
+    def versioned(self):
+        '''like get(), but returns (version, (df_vol, df_req)); version is a content hash of the data'''
+        self._load()
+        if self._current is None:
+            self.refresh()
+        elif self.age > self.interval:
+            self.refresh_async()
+
+        return self._current
+
+    def subscribe(self, listener):
+        '''call listener(version, (df_vol, df_req)) whenever a new snapshot is loaded'''
+        self._listeners.append(listener)
+
+    def refresh(self):
+        '''fetch the sheets and publish a new snapshot, unless another worker is already on it
+        '''
+        with self._lock:
+            if not self._acquire_file_lock():
+                self._wait_for_other_worker()
+                if self._current is not None:
+                    return
+            try:
+                # another worker may have published while we were waiting for the lock
+                self._load()
+                if self._current is not None and self.age <= self.interval:
+                    return
+
+                fetched_at = time.time()
+                df_vol, df_req = self.fetch()
+                self._write(df_vol, df_req, fetched_at)
+                self._load()
+            finally:
+                self._release_file_lock()
+
+    def refresh_async(self):
+        '''refresh on a short-lived thread; a no-op if this process is already refreshing'''
+        if self._lock.locked():
+            return
+        threading.Thread(target=self._safe_refresh, daemon=True).start()
+
+    def start(self):
+        '''start the background refresh loop'''
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sheet-snapshot', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._load()
+            if self._current is None or self.age >= self.interval:
+                self._safe_refresh()
+            self._stop.wait(max(self.interval - self.age, 1))
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('sheet snapshot refresh failed, keeping the stale snapshot')
+
+    def _load(self):
+        '''(re)load the shared snapshot file if it changed since we last read it'''
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+
+        with self._load_lock:
+            if mtime == self._mtime:
+                return #another thread got here first
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+            self._current = (payload['version'], (payload['volunteers'], payload['requests']))
+            self._fetched_at = payload['fetched_at']
+            self._mtime = mtime
+
+        for listener in self._listeners:
+            try:
+                listener(*self._current)
+            except Exception:
+                logger.exception('sheet snapshot listener failed')
+
+    def _write(self, df_vol, df_req, fetched_at):
+        '''write to a temp file in the same directory, then atomically swap it in'''
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(
+                    {
+                        'fetched_at': fetched_at,
+                        'version': data_version(df_vol, df_req),
+                        'volunteers': df_vol,
+                        'requests': df_req
+                    },
+                    f, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _acquire_file_lock(self):
+        try:
+            if time.time() - os.stat(self.lock_path).st_mtime > self.lock_timeout:
+                os.remove(self.lock_path) #previous holder died mid-refresh
+        except FileNotFoundError:
+            pass
+
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        self._owns_file_lock = True
+        return True
+
+    def _release_file_lock(self):
+        if self._owns_file_lock:
+            self._owns_file_lock = False
+            try:
+                os.remove(self.lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _wait_for_other_worker(self, poll=0.25):
+        '''wait (up to lock_timeout) for the worker holding the lock to publish'''
+        deadline = time.time() + self.lock_timeout
+        while os.path.exists(self.lock_path) and time.time() < deadline:
+            if self._current is not None:
+                return #serve what we have rather than wait
+            time.sleep(poll)
+            self._load()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+from clustering import ClusterIndex, unproject
+from markers import get_marker_df, get_marker_radius, render_popups
+
+class GridIndex:
+    '''Uniform lat/lon grid index over a set of points
+
+    Points are sorted by grid cell, so a bounding box query is one binary search per
+    grid row it spans plus an exact filter on the candidates.
+
+    lats, lons (array-like): point coordinates in degrees
+    cell (float): grid cell size in degrees
+    '''
+
+    def __init__(self, lats, lons, cell=0.25):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.cell = cell
+        self.ncols = int(np.ceil(360 / cell)) + 1
+
+        keys = self._row(self.lats) * self.ncols + self._col(self.lons)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def query(self, west, south, east, north):
+        '''positions of the points inside the bounding box (degrees), ascending
+        Boxes crossing the antimeridian (west > east after wrapping) are supported.
+        '''
+        if east - west >= 360:
+            west, east = -180, 180
+        else:
+            west, east = wrap_lon(west), wrap_lon(east)
+        if west > east:
+            return np.sort(np.concatenate([self.query(west, south, 180, north), self.query(-180, south, east, north)]))
+
+        rows = np.arange(self._row(max(south, -90)), self._row(min(north, 90)) + 1)
+        lo = np.searchsorted(self.keys, rows * self.ncols + self._col(west), side='left')
+        hi = np.searchsorted(self.keys, rows * self.ncols + self._col(east), side='right')
+        candidates = np.concatenate([self.order[a:b] for a, b in zip(lo, hi)]) if len(rows) else np.array([], dtype=int)
+
+        lats, lons = self.lats[candidates], self.lons[candidates]
+        inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+
+        return np.sort(candidates[inside])
+
+    def _row(self, lats):
+        return np.floor((np.clip(lats, -90, 90) + 90) / self.cell).astype(int)
+
+    def _col(self, lons):
+        return np.floor((np.clip(lons, -180, 180) + 180) / self.cell).astype(int)
+
+def wrap_lon(lon):
+    '''wrap a longitude into [-180, 180]'''
+    return lon if -180 <= lon <= 180 else (lon + 180) % 360 - 180
+
+class MarkerIndex:
+    '''Spatial index over the map markers of one category of a data snapshot
+
+    Holds a GridIndex for exact bounding box queries and a ClusterIndex with the clusters
+    of every zoom level, both built once per data version.
+
+    df (DataFrame): processed volunteers or requests
+    category (str): 'Volunteers' or 'Requests'
+    '''
+
+    def __init__(self, df, category):
+        self.category = category
+        self.df = get_marker_df(df, category)
+        self.radii = get_marker_radius(self.df, category)
+        self.grid = GridIndex(self.df['Latitude'].to_numpy(), self.df['Longtitude'].to_numpy())
+        self.clusters = ClusterIndex(self.grid.lats, self.grid.lons)
+
+    def __len__(self):
+        return len(self.grid)
+
+    def query(self, bbox, zoom, language, limit=500, cluster_below=12):
+        '''markers and clusters in view for a leaflet map
+
+        Below zoom cluster_below, or whenever more than limit markers are in view, the
+        precomputed clusters of that zoom are returned instead of the points, so the response
+        size depends on the viewport rather than on the number of rows.
+
+        bbox (tuple): west, south, east, north in degrees
+        returns {'markers': [{id, lat, lon, r, popup}], 'clusters': [[lat, lon, count]]}
+        '''
+        idx = self.grid.query(*bbox)
+        if not len(idx) or (zoom >= cluster_below and len(idx) <= limit):
+            return self._payload(idx, np.array([]), np.array([]), np.array([]), language)
+
+        west, south, east, north = bbox
+        if east - west >= 360:
+            boxes = [(-180, south, 180, north)]
+        else:
+            west, east = wrap_lon(west), wrap_lon(east)
+            boxes = [(west, south, 180, north), (-180, south, east, north)] if west > east else [(west, south, east, north)]
+
+        parts = [self.clusters.bbox(zoom, *box) for box in boxes]
+        level = parts[0][0]
+        positions = np.concatenate([p for _, p in parts])
+
+        return self._level_payload(level, positions, language)
+
+    def tile(self, zoom, x, y, language):
+        '''markers and clusters of slippy map tile zoom/x/y, same format as query
+        Zooms past the leaf level of the cluster index are not tiled: use leaf_zoom tiles.
+        '''
+        level, positions = self.clusters.tile(zoom, x, y)
+        return self._level_payload(level, positions, language)
+
+    def _level_payload(self, level, positions, language):
+        count = level.count[positions]
+        single = count == 1
+        many = positions[~single]
+        lats, lons = unproject(level.x[many], level.y[many])
+
+        return self._payload(level.point[positions[single]], lats, lons, count[~single], language)
+
+    def _payload(self, idx, c_lats, c_lons, counts, language):
+        idx = np.sort(idx)
+        popups = render_popups(self.df.iloc[idx], self.category, language) if len(idx) else []
+        markers = [
+            {
+                'id': int(self.df.index[i]),
+                'lat': round(float(self.grid.lats[i]), 5),
+                'lon': round(float(self.grid.lons[i]), 5),
+                'r': float(self.radii[i]),
+                'popup': popup
+            }
+            for i, popup in zip(idx, popups)
+        ]
+        clusters = [
+            [round(float(lat), 5), round(float(lon), 5), int(count)]
+            for lat, lon, count in zip(c_lats, c_lons, counts)
+        ]
+
+        return {'markers': markers, 'clusters': clusters}
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+'''Static export of the map: one page per language plus its marker json, written as
+content-hashed files next to gzip (and brotli, when the brotli package is installed)
+precompressed copies, and a manifest.json naming the current files
+
+    python -m static_export --out static-map
+
+Hashed files never change, so any static server or CDN can cache them forever (nginx:
+gzip_static / brotli_static). Only manifest.json is rewritten on every export.
+'''
+
+import os
+import json
+import gzip
+import time
+import hashlib
+import logging
+import argparse
+import mimetypes
+import tempfile
+
+import flask
+
+from markers import build_feature_collection
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365*24*3600
+
+def content_name(stem, suffix, data):
+    '''map-en.html -> map-en.<12 hex digits of the content hash>.html'''
+    return f'{stem}.{hashlib.sha1(data).hexdigest()[:12]}{suffix}'
+
+def write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.export-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def write_asset(out_dir, stem, suffix, data):
+    '''write data under its content-hashed name with precompressed copies; returns the name
+    Files that already exist have the same content and are left alone.
+    '''
+    name = content_name(stem, suffix, data)
+    path = os.path.join(out_dir, name)
+    if not os.path.exists(path):
+        write_atomic(path + '.gz', gzip.compress(data, compresslevel=9))
+        if brotli is not None:
+            write_atomic(path + '.br', brotli.compress(data))
+        write_atomic(path, data) #last, so a present file implies its compressed copies are too
+
+    return name
+
+def read_manifest(out_dir):
+    '''the manifest of the last export in out_dir, or None'''
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def export_static(out_dir, version, data, render_map, languages, categories):
+    '''write the map pages and marker json of one data snapshot to out_dir
+
+    version (str): data version of the snapshot
+    data (tuple): (df_vol, df_req), in the order of categories
+    render_map (callable): render_map(language, marker_urls) -> full html page, where
+        marker_urls maps each category to the (relative) url of its marker json
+    returns the manifest: {version, exported_at, maps: {language: file},
+        markers: {language: {category: file}}}
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {'version': version, 'exported_at': time.time(), 'maps': {}, 'markers': {}}
+
+    for language in languages:
+        urls = {}
+        for category, df in zip(categories, data):
+            body = json.dumps(build_feature_collection(df, category, language), separators=(',',':'))
+            urls[category] = write_asset(out_dir, f'markers-{language}-{category.lower()}', '.json', body.encode('utf-8'))
+
+        page = render_map(language, urls)
+        manifest['maps'][language] = write_asset(out_dir, f'map-{language}', '.html', page.encode('utf-8'))
+        manifest['markers'][language] = urls
+
+    write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1).encode('utf-8'))
+    logger.info('exported data version %s to %s', version, out_dir)
+
+    return manifest
+
+def prune(out_dir, manifest, older_than=24*3600):
+    '''delete exported files the manifest no longer names, once they are older_than seconds
+    (pages already open in a browser may still load the marker json of older exports)
+    '''
+    current = set(manifest['maps'].values())
+    for urls in manifest['markers'].values():
+        current.update(urls.values())
+
+    cutoff = time.time() - older_than
+    for name in os.listdir(out_dir):
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        path = os.path.join(out_dir, name)
+        if name == MANIFEST or base in current or name.startswith('.'):
+            continue
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+def send_asset(out_dir, filename):
+    '''flask response for an exported file, picking the precompressed copy the client accepts
+    Content-hashed files are cached for a year; the manifest is revalidated every minute.
+    '''
+    accepts = flask.request.headers.get('Accept-Encoding', '')
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in accepts and os.path.isfile(os.path.join(out_dir, filename + suffix)):
+            encoding = candidate
+            break
+
+    if encoding is None:
+        response = flask.send_from_directory(out_dir, filename, mimetype=mimetype)
+    else:
+        response = flask.send_from_directory(out_dir, filename + suffix, mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+
+    response.cache_control.public = True
+    if filename == MANIFEST:
+        response.cache_control.max_age = 60
+    else:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+
+    return response
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=os.environ.get('VA_STATIC_DIR', 'static-map'), help='output directory')
+    parser.add_argument('--keep', type=float, default=24, help='hours to keep files of earlier exports')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    import app
+
+    #synchronous, unlike versioned(): a background refresh would die with this process,
+    #possibly holding the snapshot lock the workers wait on
+    app.snapshot.refresh() #a no-op if the shared snapshot is still fresh
+    if app.snapshot.current is None:
+        parser.exit(1, 'no sheet snapshot could be loaded or fetched\n')
+    version, data = app.snapshot.current
+    manifest = app.export_static_map(args.out, version, data)
+    prune(args.out, manifest, older_than=args.keep*3600)
+    for language, name in manifest['maps'].items():
+        print(f'{language}: {os.path.join(args.out, name)}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import re
+from urllib.parse import quote, unquote
+
+import pytest
+
+from sheets import process_volunteers, process_requests
+from markers import render_popups
+from benchmarks.synthetic import make_volunteers, make_requests
+
+NAME = '<script>alert("hi")</script> O\'Brien & Co'
+ABOUT = '<img src=x onerror=alert(1)> I\'m "handy" & kind'
+
+def tags(html):
+    return re.findall(r'<\s*(/?\w+)', html)
+
+@pytest.fixture
+def volunteers():
+    df = process_volunteers(make_volunteers(2))
+    df.loc[0, 'Given Name'] = NAME
+    df.loc[0, 'About Me'] = ABOUT
+    return df
+
+@pytest.mark.parametrize('language', ['en', 'fr'])
+def test_volunteer_popup_escapes_sheet_text(volunteers, language):
+    hostile, benign = render_popups(volunteers, 'Volunteers', language)
+
+    assert tags(hostile) == tags(benign) #no markup from the sheet made it through
+    assert '<script>' not in hostile and '<img' not in hostile
+    assert '&lt;script&gt;alert(&#34;hi&#34;)&lt;/script&gt; O&#39;Brien &amp; Co' in hostile
+    assert '&lt;img src=x onerror=alert(1)&gt; I&#39;m &#34;handy&#34; &amp; kind' in hostile
+
+def test_mailto_subject_is_url_quoted(volunteers):
+    popup = render_popups(volunteers, 'Volunteers', 'en')[0]
+    subject = re.search(r"&Subject=([^']*)'", popup).group(1)
+
+    assert subject == 'Delivery%20Request%20for%20' + quote(NAME)
+    assert not set(subject) & set('<>"\'& ') #cannot end the href or add parameters
+    assert unquote(subject) == 'Delivery Request for ' + NAME
+
+def test_request_popup_escapes_categorical_columns():
+    df = process_requests(make_requests(2))
+    df['Type of Services'] = df['Type of Services'].cat.add_categories(['<b>Groceries</b> & more'])
+    df.loc[0, 'Type of Services'] = '<b>Groceries</b> & more'
+    hostile, benign = render_popups(df, 'Requests', 'en')
+
+    assert tags(hostile) == tags(benign)
+    assert '&lt;b&gt;Groceries&lt;/b&gt; &amp; more' in hostile
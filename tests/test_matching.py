@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sheets import process_volunteers, process_requests
+from matching import Matcher, MATCH_ATTRIBUTES, REQUIRED_ATTRIBUTES, split_choices, haversine_km
+from markers import get_marker_df
+from benchmarks.synthetic import make_volunteers, make_requests
+
+RARE = [f'Language {i}' for i in range(100)] #pushes the language vocabulary past 64 bits
+
+def crowd(df, rng):
+    '''squeeze the rows into a few km so radii overlap'''
+    df['Latitude'] = np.round(rng.uniform(45.45, 45.55, size=len(df)), 4).astype(object)
+    df['Longtitude'] = np.round(rng.uniform(-73.65, -73.5, size=len(df)), 4).astype(object)
+    return df
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(3)
+    vol = crowd(make_volunteers(60, seed=3), rng)
+    req = crowd(make_requests(40, seed=4), rng)
+
+    vol['Health'] = 'Yes'
+    vol['Availability'] = 'Yes'
+    vol.loc[:29, 'Languages Spoken'] = [f'{RARE[i]}, {RARE[i + 30]}' for i in range(30)]
+    vol.loc[30, 'Languages Spoken'] = RARE[95] #the only speaker of it
+    vol.loc[31:39, 'Languages Spoken'] = RARE[60:69]
+    req.loc[:9, 'Languages Spoken'] = [RARE[i * 7] for i in range(10)]
+    req.loc[10, 'Languages Spoken'] = RARE[95]
+    vol.loc[30, ['Latitude', 'Longtitude', 'Radius']] = [req.loc[10, 'Latitude'], req.loc[10, 'Longtitude'], '5km']
+    req.loc[11, 'Languages Spoken'] = 'Klingon' #nobody speaks it
+    req.loc[12, 'Languages Spoken'] = '' #left blank, anyone will do
+    req.loc[13, 'Type of Services'] = 'Groceries, Dog walking' #a choice no volunteer offers
+
+    return process_volunteers(vol), process_requests(req)
+
+def brute_force(df_vol, df_req):
+    '''{(request_id, volunteer_id): (distance_km, score)} by checking every pair'''
+    vol = get_marker_df(df_vol, 'Volunteers')
+    req = df_req.dropna(subset=['Latitude', 'Longtitude'])
+    matches = {}
+    for i, r in req.iterrows():
+        for j, v in vol.iterrows():
+            d = float(haversine_km(r['Latitude'], r['Longtitude'], v['Latitude'], v['Longtitude']))
+            if d > v['Radius']:
+                continue
+            score, ok = 1 - d / v['Radius'], True
+            for attr in MATCH_ATTRIBUTES:
+                wanted = split_choices('' if pd.isna(r[attr]) else r[attr])
+                offered = split_choices('' if pd.isna(v[attr]) else v[attr])
+                shared = len(wanted & offered)
+                if attr in REQUIRED_ATTRIBUTES and wanted and not shared:
+                    ok = False
+                if wanted:
+                    score += shared / len(wanted)
+            if ok:
+                matches[i, j] = (d, score)
+
+    return matches
+
+def test_match_agrees_with_brute_force(data):
+    df_vol, df_req = data
+    assert df_vol['Type of Services'].dtype.name == 'category'
+    assert len(Matcher(df_vol).vocabulary['Languages Spoken']) > 64
+
+    expected = brute_force(df_vol, df_req)
+    matches = Matcher(df_vol, chunk=7).match(df_req, top_k=len(df_vol))
+    found = {(r, v): (d, s) for r, v, d, s in
+        zip(matches['request_id'], matches['volunteer_id'], matches['distance_km'], matches['score'])}
+
+    assert expected #the data does produce matches
+    assert found.keys() == expected.keys()
+    for pair, (d, score) in expected.items():
+        assert found[pair] == pytest.approx((d, score))
+
+def test_required_language(data):
+    df_vol, df_req = data
+    matches = Matcher(df_vol).match(df_req, top_k=len(df_vol))
+    by_request = matches.groupby('request_id')['volunteer_id'].apply(set)
+
+    assert 11 not in by_request #Klingon
+    assert by_request[10] == {30} #only the speaker of the rare language
+    for request_id in range(10):
+        language = df_req.loc[request_id, 'Languages Spoken']
+        for volunteer_id in by_request.get(request_id, ()):
+            assert language in df_vol.loc[volunteer_id, 'Languages Spoken']
+
+def test_ranks_are_ordered_by_score(data):
+    df_vol, df_req = data
+    matches = Matcher(df_vol).match(df_req, top_k=3)
+
+    assert matches.groupby('request_id')['rank'].max().max() <= 3
+    for _, group in matches.groupby('request_id'):
+        assert list(group['rank']) == list(range(1, len(group) + 1))
+        assert group['score'].is_monotonic_decreasing
@@ -0,0 +1,106 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from render_pool import RenderPool
+
+class Build:
+    '''a build that blocks until released and counts its calls'''
+
+    def __init__(self, result='page', error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(max_workers=2, timeout=5, fallback_key=lambda key: key[1])
+    yield pool
+    pool.executor.shutdown(wait=True)
+
+def settle(pool, key, result):
+    '''wait for the done callback storing result as the last good one of key
+    (futures wake their waiters before running callbacks)'''
+    deadline = time.time() + 5
+    while pool._last_good.get(pool.fallback_key(key)) != result and time.time() < deadline:
+        time.sleep(0.001)
+
+def seed(pool, key, result):
+    '''a finished build of key, so it has a last good result'''
+    build = Build(result)
+    build.release.set()
+    assert pool.run(key, build) == result
+    settle(pool, key, result)
+
+def test_concurrent_runs_share_one_build(pool):
+    build = Build()
+    with ThreadPoolExecutor(8) as callers:
+        results = [callers.submit(pool.run, ('v1', 'en'), build) for _ in range(8)]
+        deadline = time.time() + 5
+        while pool.coalesced < 7 and time.time() < deadline: #every caller joined the build
+            time.sleep(0.001)
+        build.release.set()
+        assert [f.result() for f in results] == ['page'] * 8
+
+    assert build.calls == 1
+    assert pool.builds == 1
+    assert pool.coalesced == 7
+
+def test_timeout_serves_last_good_of_the_same_slot(pool):
+    seed(pool, ('v1', 'en'), 'old en')
+    seed(pool, ('v1', 'fr'), 'old fr')
+
+    build = Build('new en')
+    assert pool.run(('v2', 'en'), build, timeout=0.05) == 'old en'
+    assert pool.fallbacks == 1
+
+    build.release.set()
+    assert pool.submit(('v2', 'en'), build).result() == 'new en' #the build carried on
+    settle(pool, ('v2', 'en'), 'new en')
+    slow = Build('slow')
+    assert pool.run(('v3', 'en'), slow, timeout=0.05) == 'new en' #and refreshed the fallback
+    slow.release.set()
+
+def test_timeout_without_last_good_waits(pool):
+    build = Build()
+    threading.Timer(0.1, build.release.set).start()
+
+    assert pool.run(('v1', 'en'), build, timeout=0.01) == 'page'
+    assert pool.fallbacks == 0
+
+def test_failed_build_falls_back(pool):
+    seed(pool, ('v1', 'en'), 'old en')
+    build = Build(error=RuntimeError('sheet is broken'))
+    build.release.set()
+
+    assert pool.run(('v2', 'en'), build) == 'old en'
+    assert pool.fallbacks == 1
+
+def test_failed_build_without_fallback_raises(pool):
+    seed(pool, ('v1', 'fr'), 'old fr') #another slot
+    build = Build(error=RuntimeError('sheet is broken'))
+    build.release.set()
+
+    with pytest.raises(RuntimeError, match='sheet is broken'):
+        pool.run(('v1', 'en'), build)
+    assert pool.fallbacks == 0
+
+def test_failed_build_is_retried(pool):
+    failing = Build(error=RuntimeError('sheet is broken'))
+    failing.release.set()
+    with pytest.raises(RuntimeError):
+        pool.run(('v1', 'en'), failing)
+
+    working = Build()
+    working.release.set()
+    assert pool.run(('v1', 'en'), working) == 'page'
@@ -0,0 +1,104 @@
+import pytest
+
+from fake_sheets import FakeWorksheet
+from sheets import process_volunteers, data_version
+from sheet_sync import WorksheetSync
+from benchmarks.synthetic import make_volunteers
+
+def full_download(worksheet):
+    '''what a fresh full sync of the worksheet produces'''
+    sync = WorksheetSync(worksheet.title, process_volunteers)
+    return sync.full_sync(worksheet)
+
+def raw_rows(n, seed):
+    return make_volunteers(n, seed=seed).astype(str).values.tolist()
+
+@pytest.fixture
+def worksheet():
+    return FakeWorksheet('Volunteers', make_volunteers(40, seed=0))
+
+@pytest.fixture
+def sync(worksheet):
+    sync = WorksheetSync('Volunteers', process_volunteers)
+    sync.sync(worksheet)
+    return sync
+
+def test_first_sync_is_full(sync):
+    assert sync.full_syncs == 1
+    assert sync.incremental_syncs == 0
+    assert sync.nrows == 40
+
+def test_appended_rows_sync_incrementally(worksheet, sync):
+    worksheet.append_table(raw_rows(7, seed=1))
+    worksheet.cells_read = 0
+    df = sync.sync(worksheet)
+
+    assert sync.full_syncs == 1
+    assert sync.incremental_syncs == 1
+    assert len(df) == 47
+    assert worksheet.cells_read < 10 * worksheet.cols #the last known row and the new ones, not the sheet
+    assert data_version(df) == data_version(full_download(worksheet))
+
+def test_repeated_appends_match_full_download(worksheet, sync):
+    for seed in range(1, 4):
+        worksheet.append_table(raw_rows(3, seed=seed))
+        sync.sync(worksheet)
+
+    assert sync.incremental_syncs == 3
+    assert data_version(sync.df) == data_version(full_download(worksheet))
+
+def test_no_new_rows_is_a_noop(worksheet, sync):
+    df = sync.df
+    assert sync.sync(worksheet) is df
+    assert sync.full_syncs == 1
+
+def test_edited_last_row_falls_back_to_full_sync(worksheet, sync):
+    row = raw_rows(1, seed=5)[0]
+    worksheet.update_row(41, row) #the last row mirrored so far
+    df = sync.sync(worksheet)
+
+    assert sync.full_syncs == 2
+    assert data_version(df) == data_version(full_download(worksheet))
+
+def test_deleted_rows_fall_back_to_full_sync(worksheet, sync):
+    worksheet.delete_rows(10, number=2)
+    worksheet.append_table(raw_rows(2, seed=6))
+    df = sync.sync(worksheet)
+
+    assert sync.full_syncs == 2
+    assert len(df) == 40
+    assert data_version(df) == data_version(full_download(worksheet))
+
+def test_reconcile_interval_forces_full_sync(worksheet):
+    sync = WorksheetSync('Volunteers', process_volunteers, reconcile_interval=0)
+    sync.sync(worksheet)
+    worksheet.append_table(raw_rows(2, seed=7))
+    sync.sync(worksheet)
+
+    assert sync.full_syncs == 2
+    assert sync.incremental_syncs == 0
+
+def test_trailing_empty_cells_keep_syncs_incremental(worksheet, sync):
+    row = raw_rows(1, seed=8)[0]
+    row[-2:] = ['', ''] #a form response that left its last questions blank
+    worksheet.append_table([row])
+    sync.sync(worksheet)
+    worksheet.append_table(raw_rows(2, seed=9))
+    df = sync.sync(worksheet)
+
+    assert sync.full_syncs == 1
+    assert sync.incremental_syncs == 2
+    assert data_version(df) == data_version(full_download(worksheet))
+
+def test_full_sync_of_trailing_empty_cells_then_appends(worksheet):
+    row = raw_rows(1, seed=8)[0]
+    row[-1] = ''
+    worksheet.append_table([row]) #the last row a full sync sees ends blank
+    sync = WorksheetSync('Volunteers', process_volunteers)
+    sync.sync(worksheet)
+    worksheet.append_table(raw_rows(2, seed=9))
+    df = sync.sync(worksheet)
+
+    assert sync.full_syncs == 1
+    assert sync.incremental_syncs == 1
+    assert data_version(df) == data_version(full_download(worksheet))
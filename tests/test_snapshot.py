@@ -0,0 +1,46 @@
+import os
+import time
+
+import pytest
+
+from fake_sheets import FakeClient
+from sheets import get_sheets_df
+from snapshot import SheetSnapshot
+from benchmarks.synthetic import make_volunteers, make_requests
+
+@pytest.fixture
+def client():
+    return FakeClient({'sheet': {'Volunteers': make_volunteers(30), 'Requests': make_requests(20)}})
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'snapshot.pkl')
+
+def snapshot(client, path, **kwargs):
+    return SheetSnapshot(lambda: get_sheets_df(client, 'sheet'), path=path, **kwargs)
+
+def test_workers_share_one_fetch(client, path):
+    first, second = snapshot(client, path), snapshot(client, path)
+
+    version, _ = first.versioned()
+    assert second.versioned()[0] == version
+    assert client.calls == 1
+
+def test_held_lock_serves_the_existing_snapshot(client, path):
+    first, second = snapshot(client, path, interval=0), snapshot(client, path, interval=0)
+    first.refresh()
+    open(path + '.lock', 'w').close() #another worker is refreshing
+
+    second.refresh()
+    assert second.current is not None
+    assert client.calls == 1 #waited for the other worker instead of fetching too
+
+def test_stale_lock_is_taken_over(client, path):
+    open(path + '.lock', 'w').close()
+    old = time.time() - 3600
+    os.utime(path + '.lock', (old, old)) #its holder died mid-refresh
+
+    assert snapshot(client, path, lock_timeout=60).current is None
+    snapshot(client, path, lock_timeout=60).refresh()
+    assert client.calls == 1
+    assert not os.path.exists(path + '.lock')
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from clustering import ClusterIndex, project
+from spatial import GridIndex, MarkerIndex, wrap_lon
+from sheets import process_volunteers
+from benchmarks.synthetic import make_volunteers
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    lats = np.concatenate([rng.uniform(-80, 80, 2000), rng.normal(45.5, 0.05, 500), [0, 10, -10]])
+    lons = np.concatenate([rng.uniform(-180, 180, 2000), rng.normal(-73.6, 0.05, 500), [180, -180, 179.999]])
+    return lats, lons
+
+def brute_force(lats, lons, west, south, east, north):
+    inside_lons = (lons >= west) & (lons <= east) if west <= east else (lons >= west) | (lons <= east)
+    return np.nonzero((lats >= south) & (lats <= north) & inside_lons)[0]
+
+@pytest.mark.parametrize('bbox', [
+    (-74, 45, -73, 46),
+    (-180, -90, 180, 90),
+    (170, -20, -170, 20), #crosses the antimeridian
+    (175, -20, 190, 20), #leaflet past 180 on the other side
+    (-10, 5, 10, 5), #a line
+])
+def test_grid_query_agrees_with_brute_force(points, bbox):
+    lats, lons = points
+    west, south, east, north = bbox
+    expected = brute_force(lats, lons, wrap_lon(west), south, wrap_lon(east), north)
+
+    assert list(GridIndex(lats, lons).query(*bbox)) == list(expected)
+
+def test_cluster_counts_sum_to_points(points):
+    index = ClusterIndex(*points)
+    for zoom, level in index.levels.items():
+        assert level.count.sum() == len(points[0]), zoom
+        single = level.count == 1
+        assert (level.point[single] >= 0).all() and (level.point[~single] == -1).all()
+
+    assert sorted(index.levels[index.leaf_zoom].point) == list(range(len(points[0])))
+
+def test_tiles_partition_each_level(points):
+    index = ClusterIndex(*points, max_zoom=8)
+    for zoom, level in index.levels.items():
+        n = 2**zoom
+        assert (np.diff(level.keys) >= 0).all()
+        seen = np.concatenate([level.tile(key % n, key // n) for key in np.unique(level.keys)])
+        assert sorted(seen) == list(range(len(level)))
+
+        tx = np.clip(np.floor(level.x.astype(float) * n), 0, n - 1)
+        ty = np.clip(np.floor(level.y.astype(float) * n), 0, n - 1)
+        assert ((ty * n + tx) == level.keys).all() #every cluster sits in the tile it is served from
+
+@pytest.mark.parametrize('zoom', [0, 3, 6, 16])
+def test_cluster_bbox_agrees_with_brute_force(points, zoom):
+    index = ClusterIndex(*points)
+    west, south, east, north = -80, 40, -70, 50
+    level, positions = index.bbox(zoom, west, south, east, north)
+
+    (x0, x1), (y1, y0) = project([south, north], [west, east])
+    x, y = level.x, level.y
+    expected = np.nonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1))[0]
+    assert sorted(positions) == list(expected)
+
+def test_marker_tiles_cover_every_marker():
+    df = process_volunteers(make_volunteers(300, seed=2, region='world'))
+    index = MarkerIndex(df, 'Volunteers')
+    for zoom in (0, 2, 5):
+        level = index.clusters.level(zoom)
+        n = 2**zoom
+        total = 0
+        for key in np.unique(level.keys):
+            payload = index.tile(zoom, key % n, key // n, 'en')
+            total += len(payload['markers']) + sum(count for _, _, count in payload['clusters'])
+        assert total == len(index)
+
+def test_marker_query_across_the_antimeridian():
+    df = process_volunteers(make_volunteers(300, seed=2, region='world'))
+    index = MarkerIndex(df, 'Volunteers')
+    bbox = (150, -60, -150, 60)
+    expected = brute_force(index.grid.lats, index.grid.lons, 150, -60, -150, 60)
+
+    result = index.query(bbox, zoom=14, language='en', limit=len(index))
+    assert sorted(m['id'] for m in result['markers']) == sorted(int(i) for i in index.df.index[expected])
+    assert (index.grid.lons[expected] > 0).any() and (index.grid.lons[expected] < 0).any() #both sides
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+TRANSLATIONS = {
+    'Volunteers':{'fr':'Bénévole'},
+    'Requests':{'fr':'Demandes'},
+    'Interactive Map':{'fr':'Carte interactive'},
+    'Volunteer Signup Form':{'fr':'Inscription des bénévoles'},
+    'Delivery Request Form':{'fr':'Demande de livraison'},
+    'About Us':{'fr':'À propos de nous'},
+    'Name':{'fr':'Nom'},
+    'Country':{'fr':'Pays'},
+    'City':{'fr':'Ville'},
+    'Services':{'fr':'Services'},
+    'Transportation':{'fr':'Transport'},
+    'Radius':{'fr':'Radius'},
+    'Day of Week':{'fr':'Jour de la semaine'},
+    'Time of Day':{'fr':'Moment de la journée'},
+    'Languages':{'fr':'Langues'},
+    'Payment':{'fr':'Paiement'},
+    'About Me':{'fr':'À propos de moi'},
+    'Type':{'fr':'Type'},
+    # '':{'fr':''},
+}
+
+def translator(word, language):
+    if language != 'en':
+        return TRANSLATIONS[word][language]
+    else:
+        return word